@@ -0,0 +1,153 @@
+"""
+Headless batch analysis of positions for offline jobs. Reads one position per line (GameState.getFen
+notation, blank lines and lines starting with '#' are skipped) from a file or stdin, analyses them on
+all cores and writes one JSON line per position as soon as it is done, in completion order.
+
+Only a bounded number of positions is in flight at any time, so input of any size can be streamed.
+A checkpoint file next to the output records finished line numbers and the output size at that point -
+rerunning the same command on the same input cuts the output back to that size and resumes from there,
+so records written after the last checkpoint, possibly a partial line, are dropped and redone.
+
+    python analyseBatch.py positions.txt -o results.jsonl --depth 4
+    cat dump.txt | python analyseBatch.py - -o results.jsonl --nodes 20000 --workers 8
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+
+import chessAI
+import chessEngine
+import moveOrdering
+
+# per process state, created once by initWorker so tables stay warm between positions
+workerState = None
+workerSearch = None
+
+
+def initWorker():
+    global workerState, workerSearch
+    workerState = chessEngine.GameState()
+    workerSearch = chessAI.Search(moveOrdering.MoveOrderer(), chessAI.TranspositionTable())
+
+
+""" analyse one position, returns the JSON record for it - failures become error records so the line counts as done """
+def analysePosition(task):
+    lineNumber, fen, depth, nodes = task
+    start = time.perf_counter()
+    try:
+        workerState.setFen(fen)
+        workerSearch.orderer.decay()
+        move, score = workerSearch.think(workerState, depth, maxNodes=nodes)
+        return {"line": lineNumber, "fen": fen, "bestmove": move.getChessNotation() if move is not None else None,
+                "score": score, "depth": workerSearch.depth, "nodes": workerSearch.nodes,
+                "pv": [lineMove.getChessNotation() for lineMove in
+                       (workerSearch.principalVariation(workerState, move, workerSearch.depth) if move else [])],
+                "seconds": round(time.perf_counter() - start, 4)}
+    except ValueError as e:
+        return {"line": lineNumber, "fen": fen, "error": str(e)}
+    except Exception as e:
+        return {"line": lineNumber, "fen": fen, "error": "%s: %s" % (type(e).__name__, e)}
+
+
+class Checkpoint():
+    """ finished line numbers: everything below watermark plus the finished lines above it, and the output size """
+
+    def __init__(self, path):
+        self.path = path
+        self.watermark = 0
+        self.done = set()
+        self.offset = None # bytes of output holding exactly the finished lines
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.watermark = state["watermark"]
+            self.done = set(state["done"])
+            self.offset = state.get("offset")
+
+    def isDone(self, lineNumber):
+        return lineNumber < self.watermark or lineNumber in self.done
+
+    def add(self, lineNumber):
+        if lineNumber < self.watermark:
+            return
+        self.done.add(lineNumber)
+        while self.watermark in self.done: # done stays as small as the number of positions in flight
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    """ skipped lines (blank, comments, resumed) count as done so the watermark can pass them """
+    def skip(self, lineNumber):
+        self.add(lineNumber)
+
+    def save(self, offset):
+        self.offset = offset
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump({"watermark": self.watermark, "done": sorted(self.done), "offset": offset}, f)
+        os.replace(temp, self.path) # atomic, a crash leaves the old or the new checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analyse a stream of positions to JSON lines")
+    parser.add_argument("input", help="file with one position per line, - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output, appended to when resuming")
+    parser.add_argument("--depth", type=int, default=None, help="search depth (default 4, or unlimited with --nodes)")
+    parser.add_argument("--nodes", type=int, default=None, help="node budget per position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="results between checkpoint writes")
+    args = parser.parse_args()
+    depth = args.depth or (64 if args.nodes else 4)
+
+    checkpoint = Checkpoint(args.output + ".checkpoint")
+    source = sys.stdin if args.input == "-" else open(args.input)
+    output = open(args.output, "a")
+    if checkpoint.offset is not None:
+        output.truncate(checkpoint.offset) # drop what was written after the checkpoint, it is redone
+    inFlight = threading.BoundedSemaphore(4 * args.workers) # bounds memory no matter how large the input is
+    lock = threading.Lock()
+    counts = {"written": 0, "errors": 0}
+
+    def finished(record):
+        with lock:
+            output.write(json.dumps(record) + "\n")
+            counts["written"] += 1
+            counts["errors"] += "error" in record
+            checkpoint.add(record["line"])
+            if counts["written"] % args.checkpoint_every == 0:
+                output.flush()
+                checkpoint.save(output.tell())
+        inFlight.release()
+
+    # the task itself failed (analysePosition catches errors, so e.g. a dead worker) - record it as done anyway
+    def failed(lineNumber, fen, error):
+        print("worker failed on line %d: %r" % (lineNumber, error), file=sys.stderr)
+        finished({"line": lineNumber, "fen": fen, "error": "worker failed: %r" % error})
+
+    start = time.perf_counter()
+    with mp.Pool(args.workers, initializer=initWorker) as pool:
+        for lineNumber, line in enumerate(source):
+            fen = line.strip()
+            if checkpoint.isDone(lineNumber) or not fen or fen.startswith("#"):
+                with lock:
+                    checkpoint.skip(lineNumber)
+                continue
+            inFlight.acquire()
+            pool.apply_async(analysePosition, ((lineNumber, fen, depth, args.nodes),),
+                             callback=finished, error_callback=lambda error, lineNumber=lineNumber, fen=fen:
+                             failed(lineNumber, fen, error))
+        pool.close()
+        pool.join()
+    output.flush()
+    checkpoint.save(output.tell())
+    output.close()
+    elapsed = time.perf_counter() - start
+    print(f"{counts['written']} positions ({counts['errors']} errors) in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+Local analysis server. Clients send positions in the text notation of GameState.getFen and receive a
+result for every finished search depth, either over HTTP (streamed as JSON lines) or over a WebSocket.
+Searches run in a pool of worker processes that are started once and kept warm, so their transposition
+and move ordering tables survive between requests.
+
+    POST /analyse          body {"fen": ..., "depth": 4}, answered with JSON lines, the last one has "done"
+    DELETE /analyse/<id>   cancel a queued or running analysis
+    GET /ws                WebSocket: send {"fen": ..., "depth": ...} or {"cancel": id}, receive the same messages
+    GET /stats             request latency percentiles and worker utilisation
+
+Run with: python analysisServer.py --port 8765 --workers 4
+"""
+
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import struct
+import threading
+import time
+
+import chessAI
+import chessEngine
+import moveOrdering
+
+maxDepth = 8
+websocketGuid = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+httpReasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 503: "Service Unavailable"}
+
+
+""" worker process: one GameState and one Search, reused for every request """
+def workerMain(workerId, tasks, results, cancelEvent, cancelJob):
+    gs = chessEngine.GameState()
+    search = chessAI.Search(moveOrdering.MoveOrderer(), chessAI.TranspositionTable())
+    search.findBestMove(gs, 1) # warm up
+    currentJob = [-1]
+
+    # the search checks a plain attribute, so a helper thread turns cancel requests into search.stopped
+    def watchCancel():
+        while True:
+            cancelEvent.wait()
+            cancelEvent.clear()
+            if cancelJob.value == currentJob[0]:
+                search.stopped = True
+    threading.Thread(target=watchCancel, daemon=True).start()
+
+    def report(jobId, depth, move, score, line):
+        results.put((workerId, jobId, {"id": jobId, "depth": depth, "move": move.getChessNotation(), "score": score,
+                                       "pv": [lineMove.getChessNotation() for lineMove in line]}, False))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        jobId, fen, depth = task
+        currentJob[0] = jobId
+        search.stopped = cancelJob.value == jobId # cancelled while queued, before the watcher knew the job
+        try:
+            gs.setFen(fen) # already validated by the server
+            search.orderer.decay()
+            move, score = search.think(gs, depth, lambda *result: report(jobId, *result))
+            message = {"id": jobId, "done": True, "cancelled": search.stopped,
+                       "bestmove": move.getChessNotation() if move is not None else None,
+                       "score": score, "nodes": search.nodes}
+        except Exception as e: # answer and stay in the pool whatever the position does to the engine
+            message = {"id": jobId, "done": True, "error": "%s: %s" % (type(e).__name__, e)}
+        results.put((workerId, jobId, message, True))
+        currentJob[0] = -1
+
+
+class Job():
+
+    def __init__(self, jobId, fen, depth):
+        self.id = jobId
+        self.fen = fen
+        self.depth = depth
+        self.messages = asyncio.Queue() # results for the client, the last one has "done"
+        self.worker = None
+        self.cancelled = False
+        self.finished = False
+        self.received = time.perf_counter()
+
+
+class Worker():
+
+    def __init__(self, workerId, context, results):
+        self.tasks = context.Queue()
+        self.cancelEvent = context.Event()
+        self.cancelJob = context.Value('q', -1)
+        self.process = context.Process(target=workerMain, daemon=True,
+                                       args=(workerId, self.tasks, results, self.cancelEvent, self.cancelJob))
+        self.job = None
+        self.busySince = None
+        self.busyTime = 0.0
+
+
+class AnalysisServer():
+
+    def __init__(self, numWorkers, maxPending=64):
+        self.numWorkers = numWorkers
+        self.maxPending = maxPending
+        self.jobs = {} # unfinished jobs by id
+        self.jobIds = itertools.count(1)
+        self.latencies = collections.deque(maxlen=10000) # seconds from request to final result
+        self.validator = chessEngine.GameState() # to reject malformed positions before queueing them
+
+    """ start the workers and serve until cancelled """
+    async def serve(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        self.started = time.perf_counter()
+        context = mp.get_context("spawn")
+        self.results = context.Queue()
+        self.workers = [Worker(i, context, self.results) for i in range(self.numWorkers)]
+        for worker in self.workers:
+            worker.process.start()
+        self.idle = asyncio.Queue()
+        for i in range(self.numWorkers):
+            self.idle.put_nowait(i)
+        self.pending = asyncio.Queue(self.maxPending) # bounded - full means the server is overloaded
+        threading.Thread(target=self.readResults, daemon=True).start()
+        dispatcher = asyncio.create_task(self.dispatch())
+        server = await asyncio.start_server(self.handleClient, host, port)
+        print(f"analysis server on {host}:{port} with {self.numWorkers} workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            dispatcher.cancel()
+            for worker in self.workers:
+                worker.tasks.put(None)
+
+    """ thread that moves worker results into the event loop """
+    def readResults(self):
+        while True:
+            workerId, jobId, message, finished = self.results.get()
+            self.loop.call_soon_threadsafe(self.onResult, workerId, jobId, message, finished)
+
+    def onResult(self, workerId, jobId, message, finished):
+        job = self.jobs.get(jobId)
+        if job is not None:
+            job.messages.put_nowait(message)
+        if finished:
+            worker = self.workers[workerId]
+            worker.busyTime += time.perf_counter() - worker.busySince
+            worker.busySince = None
+            worker.job = None
+            if job is not None:
+                self.finish(job)
+            self.idle.put_nowait(workerId)
+
+    def finish(self, job):
+        job.finished = True
+        self.jobs.pop(job.id, None)
+        self.latencies.append(time.perf_counter() - job.received)
+
+    """ hand queued jobs to idle workers """
+    async def dispatch(self):
+        while True:
+            job = await self.pending.get()
+            workerId = await self.idle.get()
+            if job.cancelled:
+                self.idle.put_nowait(workerId)
+                continue
+            worker = self.workers[workerId]
+            worker.job = job
+            worker.busySince = time.perf_counter()
+            job.worker = workerId
+            worker.tasks.put((job.id, job.fen, job.depth))
+
+    """ queue an analysis, returns the Job or an error message """
+    def submit(self, request):
+        try:
+            fen = request["fen"]
+            if not isinstance(fen, str):
+                raise TypeError("fen must be a string")
+            depth = int(request.get("depth", 4))
+            self.validator.setFen(fen)
+        except (KeyError, TypeError, ValueError, OverflowError) as e: # OverflowError: depth Infinity
+            return "bad request: %s" % e
+        if not 1 <= depth <= maxDepth:
+            return "depth must be between 1 and %d" % maxDepth
+        if self.pending.full():
+            return None # caller answers with 503
+        job = Job(next(self.jobIds), fen, depth)
+        self.jobs[job.id] = job
+        self.pending.put_nowait(job)
+        return job
+
+    """ cancel a job, returns False if it is unknown or already finished """
+    def cancel(self, jobId):
+        job = self.jobs.get(jobId)
+        if job is None or job.cancelled:
+            return False
+        job.cancelled = True
+        if job.worker is None: # still queued - the dispatcher skips it
+            job.messages.put_nowait({"id": job.id, "done": True, "cancelled": True})
+            self.finish(job)
+        else:
+            worker = self.workers[job.worker]
+            worker.cancelJob.value = job.id
+            worker.cancelEvent.set()
+        return True
+
+    def stats(self):
+        now = time.perf_counter()
+        latencies = sorted(self.latencies)
+        percentiles = {}
+        for p in (50, 90, 99):
+            percentiles["p%d" % p] = latencies[min(len(latencies) - 1, len(latencies) * p // 100)] if latencies else None
+        utilisation = [(worker.busyTime + (now - worker.busySince if worker.busySince else 0)) / (now - self.started)
+                       for worker in self.workers]
+        return {"requests": len(latencies), "latency": percentiles, "pending": self.pending.qsize(),
+                "running": sum(worker.job is not None for worker in self.workers), "utilisation": utilisation}
+
+    """ forward a job's messages with send(message) until it is done, cancel it if the client goes away """
+    async def stream(self, job, send):
+        try:
+            while True:
+                message = await job.messages.get()
+                await send(message)
+                if message.get("done"):
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            self.cancel(job.id)
+            raise
+
+    async def handleClient(self, reader, writer):
+        try:
+            requestLine = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(requestLine) < 2:
+                return
+            method, path = requestLine[0], requestLine[1]
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            if method == "POST" and path == "/analyse":
+                await self.handleAnalyse(body, writer)
+            elif method == "DELETE" and path.startswith("/analyse/"):
+                found = path[len("/analyse/"):].isdigit() and self.cancel(int(path[len("/analyse/"):]))
+                await self.respond(writer, 200 if found else 404, {"cancelled": found})
+            elif method == "GET" and path == "/stats":
+                await self.respond(writer, 200, self.stats())
+            elif method == "GET" and path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self.handleWebsocket(reader, writer, headers)
+            else:
+                await self.respond(writer, 404, {"error": "not found"})
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload):
+        data = json.dumps(payload).encode()
+        writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+                     b"Connection: close\r\n\r\n" % (status, httpReasons[status].encode(), len(data)) + data)
+        await writer.drain()
+
+    async def handleAnalyse(self, body, writer):
+        try:
+            request = json.loads(body)
+        except ValueError:
+            request = None
+        job = self.submit(request) if isinstance(request, dict) else "bad request: body must be a JSON object"
+        if job is None:
+            await self.respond(writer, 503, {"error": "too many pending requests"})
+            return
+        if isinstance(job, str):
+            await self.respond(writer, 400, {"error": job})
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+        async def send(message):
+            data = json.dumps(message).encode() + b"\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            await writer.drain() # waits for slow clients instead of buffering without bound
+
+        await send({"id": job.id, "queued": True})
+        await self.stream(job, send)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def handleWebsocket(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + websocketGuid).encode()).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: %s\r\n\r\n" % accept)
+        await writer.drain()
+        lock = asyncio.Lock()
+
+        async def send(message, opcode=1):
+            data = json.dumps(message).encode() if opcode == 1 else message
+            if len(data) < 126:
+                header = struct.pack("!BB", 0x80 | opcode, len(data))
+            elif len(data) < 1 << 16:
+                header = struct.pack("!BBH", 0x80 | opcode, 126, len(data))
+            else:
+                header = struct.pack("!BBQ", 0x80 | opcode, 127, len(data))
+            async with lock:
+                writer.write(header + data)
+                await writer.drain()
+
+        streams = set()
+        try:
+            while True:
+                opcode, payload = await readFrame(reader)
+                if opcode == 8: # close
+                    break
+                if opcode == 9: # ping
+                    await send(payload, opcode=10)
+                    continue
+                if opcode != 1:
+                    continue
+                try:
+                    request = json.loads(payload)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    await send({"error": "messages must be JSON objects"})
+                elif "cancel" in request:
+                    await send({"id": request["cancel"], "cancelling": self.cancel(request["cancel"])})
+                else:
+                    job = self.submit(request)
+                    if job is None:
+                        await send({"error": "too many pending requests"})
+                    elif isinstance(job, str):
+                        await send({"error": job})
+                    else:
+                        await send({"id": job.id, "queued": True})
+                        task = asyncio.create_task(self.stream(job, send))
+                        streams.add(task)
+                        task.add_done_callback(streams.discard)
+        finally:
+            for task in list(streams): # client went away - stop its searches
+                task.cancel()
+
+
+""" read one client frame, returns (opcode, unmasked payload) - fragmented messages are not supported """
+async def readFrame(reader):
+    first, second = await reader.readexactly(2)
+    length = second & 0x7f
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    payload = bytearray(await reader.readexactly(length))
+    for i in range(length):
+        payload[i] ^= mask[i % 4]
+    return first & 0x0f, bytes(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="position analysis server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-pending", type=int, default=64, help="queued requests before answering 503")
+    args = parser.parse_args()
+    try:
+        asyncio.run(AnalysisServer(args.workers, args.max_pending).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
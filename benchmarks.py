@@ -0,0 +1,186 @@
+"""
+Benchmarks and validation runs for the engine, run as: python benchmarks.py <benchmark> [options]
+Positions are produced by seeded random play, so runs are repeatable.
+"""
+
+import argparse
+import random
+import time
+
+import chessAI
+import chessEngine
+import moveOrdering
+import nnue
+
+
+""" play random games from the start position and return copies of positions along the way """
+def randomPositions(count, seed=0, minPlies=10, maxPlies=80):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        gs = chessEngine.GameState()
+        for ply in range(rng.randint(minPlies, maxPlies)):
+            moves = gs.getPossibleMoves() # pseudo legal moves are good enough to reach varied positions
+            if not moves:
+                break
+            gs.makeMove(rng.choice(moves))
+        if 'wk' in gs.board and 'bk' in gs.board:
+            position = chessEngine.GameState()
+            position.setPosition(gs.packPosition())
+            positions.append(position)
+    return positions
+
+
+""" captures (not en passant) by the side to move, taken from the move generators """
+def captureMoves(gs):
+    return [move for move in gs.getPossibleMoves() if move.captured_piece != "--" and not move.isEnPassant]
+
+
+""" best gain for the side to move from capturing on (r,c) by playing out every capture sequence """
+def bruteExchange(gs, r, c):
+    best = 0 # the side to move may always stop capturing
+    for move in captureMoves(gs):
+        if (move.endRow, move.endCol) == (r, c) and not move.isPawnPromotion:
+            gs.makeMove(move)
+            best = max(best, chessEngine.seeValues[move.captured_piece[1]] - bruteExchange(gs, r, c))
+            gs.undoMove()
+    return best
+
+
+""" static exchange evaluation: attack tables against move generation and SEE against brute force """
+def benchSee(args):
+    positions = randomPositions(args.positions, args.seed)
+    attackerErrors = exchangeErrors = 0
+    captures = []
+    for gs in positions:
+        # every capture the generators produce must come from a piece attackersTo finds, and the other way round
+        generated = {}
+        for move in captureMoves(gs):
+            generated.setdefault((move.endRow, move.endCol), set()).add((move.startRow, move.startCol))
+        for (r, c), starts in generated.items():
+            found = {(row, col) for value, row, col in gs.attackersTo(r, c, gs.whiteToMove)}
+            if found != starts:
+                attackerErrors += 1
+        captures += [(gs, move) for move in captureMoves(gs) if not move.isPawnPromotion]
+
+    seeTime = bruteTime = 0
+    for gs, move in captures:
+        start = time.perf_counter()
+        see = gs.staticExchange(move)
+        seeTime += time.perf_counter() - start
+        start = time.perf_counter()
+        gs.makeMove(move)
+        brute = chessEngine.seeValues[move.captured_piece[1]] - bruteExchange(gs, move.endRow, move.endCol)
+        gs.undoMove()
+        bruteTime += time.perf_counter() - start
+        if see != brute:
+            exchangeErrors += 1
+    print(f"{len(positions)} positions, {len(captures)} captures")
+    print(f"attacker sets differing from move generation: {attackerErrors}")
+    print(f"SEE differing from brute force: {exchangeErrors} ({100*exchangeErrors/max(1, len(captures)):.2f}%)")
+    print(f"SEE {1e6*seeTime/max(1, len(captures)):.1f} us, brute force {1e6*bruteTime/max(1, len(captures)):.1f} us per capture")
+
+
+""" alpha-beta node counts with and without the move ordering heuristics """
+def benchOrdering(args):
+    positions = randomPositions(args.positions, args.seed)
+    orderer = moveOrdering.MoveOrderer()
+    totals = {}
+    for name, search in (("generation order", chessAI.Search()), ("heuristics", chessAI.Search(orderer))):
+        nodes = 0
+        scores = []
+        start = time.perf_counter()
+        for gs in positions:
+            orderer.decay()
+            move, score = search.findBestMove(gs, args.depth)
+            nodes += search.nodes
+            scores.append(score)
+        totals[name] = (nodes, time.perf_counter() - start, scores)
+    plain, ordered = totals["generation order"], totals["heuristics"]
+    print(f"{len(positions)} positions searched to depth {args.depth}")
+    for name, (nodes, elapsed, scores) in totals.items():
+        print(f"{name:>16}: {nodes} nodes, {elapsed:.2f}s")
+    print(f"node reduction: {100 * (1 - ordered[0] / plain[0]):.1f}%, same scores: {plain[2] == ordered[2]}")
+
+
+""" play one game between two searches, returns 1, 0 or -1 for white """
+def playMatchGame(white, black, nodes, maxPlies=200):
+    gs = chessEngine.GameState()
+    for ply in range(maxPlies):
+        search, network = white if gs.whiteToMove else black
+        if network is not None:
+            nnue.attach(gs, network)
+        else:
+            nnue.detach(gs)
+        move, score = search.think(gs, 64, maxNodes=nodes)
+        if move is None:
+            break
+        gs.makeMove(move)
+    gs.getValidMoves()
+    if gs.isCheckMate:
+        return -1 if gs.whiteToMove else 1
+    return 0
+
+
+""" NNUE evaluations per second with incremental updates against full recomputation, optional match """
+def benchNnue(args):
+    network = nnue.Network.load(args.weights) if args.weights else nnue.Network.random()
+    positions = randomPositions(args.positions, args.seed)
+    maxError = 0.0
+    incremental = full = 0.0
+    evaluations = 0
+    for gs in positions:
+        nnue.attach(gs, network)
+        moves = gs.getValidMoves()
+        start = time.perf_counter()
+        for move in moves:
+            gs.makeMove(move)
+            gs.accumulator.evaluate()
+            gs.undoMove()
+        incremental += time.perf_counter() - start
+        start = time.perf_counter()
+        for move in moves:
+            gs.makeMove(move)
+            network.output(network.firstLayer(gs))
+            gs.undoMove()
+        full += time.perf_counter() - start
+        for move in moves: # the accumulator must match a recomputation
+            gs.makeMove(move)
+            layer = gs.accumulator.stack[gs.accumulator.top]
+            maxError = max(maxError, float(abs(layer - network.firstLayer(gs)).max()))
+            gs.undoMove()
+        evaluations += len(moves)
+        nnue.detach(gs)
+    print(f"{evaluations} evaluations after makeMove, hidden size {network.hidden}")
+    print(f"incremental: {evaluations / incremental:.0f} evals/s, full recomputation: {evaluations / full:.0f} evals/s")
+    print(f"largest accumulator difference to recomputation: {maxError:.2e}")
+    if args.games:
+        results = []
+        for game in range(args.games):
+            neural = (chessAI.Search(moveOrdering.MoveOrderer()), network)
+            material = (chessAI.Search(moveOrdering.MoveOrderer()), None)
+            if game % 2 == 0:
+                results.append(playMatchGame(neural, material, args.nodes))
+            else:
+                results.append(-playMatchGame(material, neural, args.nodes))
+        print(f"network against material in {args.games} games: +{results.count(1)} ={results.count(0)} -{results.count(-1)}")
+
+
+benchmarks = {'see': benchSee, 'ordering': benchOrdering, 'nnue': benchNnue}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="engine benchmarks")
+    parser.add_argument("benchmark", choices=sorted(benchmarks))
+    parser.add_argument("--positions", type=int, default=200, help="number of random positions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depth", type=int, default=3, help="search depth for search benchmarks")
+    parser.add_argument("--weights", help="nnue: network weights file, random weights if not given")
+    parser.add_argument("--games", type=int, default=0, help="nnue: match games against the material evaluation")
+    parser.add_argument("--nodes", type=int, default=500, help="nnue: search nodes per move in match games")
+    args = parser.parse_args()
+    benchmarks[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
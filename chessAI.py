@@ -0,0 +1,184 @@
+"""
+Computer player: negamax search with alpha-beta pruning over a GameState.
+Scores are in centipawns from the point of view of the side to move.
+"""
+
+checkmateScore = 100000
+stalemateScore = 0
+mateBound = checkmateScore - 1000 # scores beyond this are mates, -checkmateScore + ply of the mated side
+
+# transposition table entry types
+exact, lowerBound, upperBound = 0, 1, 2
+
+
+""" evaluation of the position from white's point of view - the network if one is attached, else material """
+def scoreBoard(gs):
+    if gs.accumulator is not None:
+        return gs.accumulator.evaluate()
+    return gs.materialScore
+
+
+class TranspositionTable():
+    """
+    search results by zobrist key: (depth, score, type, best moveID). Cleared when it gets full.
+    Mate scores are stored as distance from the node and turned back into distance from the root of
+    the probing search with its ply, so they stay right across plies and searches
+    """
+
+    def __init__(self, maxEntries=1 << 20):
+        self.maxEntries = maxEntries
+        self.entries = {}
+
+    def get(self, key, ply=0):
+        entry = self.entries.get(key)
+        if entry is None or abs(entry[1]) <= mateBound:
+            return entry
+        depth, score, entryType, moveID = entry
+        return depth, score - ply if score > 0 else score + ply, entryType, moveID
+
+    def store(self, key, depth, score, entryType, moveID, ply=0):
+        if len(self.entries) >= self.maxEntries:
+            self.entries.clear()
+        if score > mateBound:
+            score += ply
+        elif score < -mateBound:
+            score -= ply
+        self.entries[key] = (depth, score, entryType, moveID)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class Search():
+
+    def __init__(self, orderer=None, table=None):
+        self.orderer = orderer # optional moveOrdering.MoveOrderer
+        self.table = table # optional TranspositionTable, kept between searches
+        self.nodes = 0
+        self.bestMove = None
+        self.depth = 0 # deepest depth finished by think
+        self.stopped = False # set from another thread to abort the running search
+        self.nodeLimit = float('inf') # the search stops itself after this many nodes
+
+    """ search gs to depth plies and return (best move, score) - validMoves can be passed if already known """
+    def findBestMove(self, gs, depth, validMoves=None):
+        if validMoves is None:
+            validMoves = gs.getValidMoves()
+        checkMate, staleMate = gs.isCheckMate, gs.isStaleMate # the search overwrites these flags
+        self.nodes = 0
+        self.bestMove = None
+        score = self.negamax(gs, list(validMoves), depth, -checkmateScore - 1, checkmateScore + 1, 0)
+        gs.isCheckMate, gs.isStaleMate = checkMate, staleMate
+        return self.bestMove, score
+
+    """
+    iterative deepening from depth 1 to maxDepth, calling callback(depth, move, score, line) after
+    every finished depth. Stops early after maxNodes nodes if given.
+    Returns (best move, score) of the deepest finished depth, which is stored in self.depth
+    """
+    def think(self, gs, maxDepth, callback=None, maxNodes=None):
+        validMoves = gs.getValidMoves()
+        result = (None, 0)
+        nodes = 0
+        self.depth = 0
+        for depth in range(1, maxDepth + 1):
+            if maxNodes is not None:
+                self.nodeLimit = maxNodes - nodes
+            move, score = self.findBestMove(gs, depth, validMoves)
+            nodes += self.nodes
+            if self.stopped or move is None:
+                break
+            result = (move, score)
+            self.depth = depth
+            if callback is not None:
+                callback(depth, move, score, self.principalVariation(gs, move, depth))
+        if maxNodes is not None and nodes > maxNodes: # out of nodes, not stopped from outside
+            self.stopped = False
+        self.nodeLimit = float('inf')
+        self.nodes = nodes
+        return result
+
+    """ best line starting with move, following the best moves stored in the transposition table """
+    def principalVariation(self, gs, move, length):
+        line = [move]
+        gs.makeMove(move)
+        while self.table is not None and len(line) < length:
+            entry = self.table.get(gs.zobristKey)
+            nextMove = None
+            if entry is not None:
+                for validMove in gs.getPossibleMoves():
+                    if validMove.moveID == entry[3]:
+                        nextMove = validMove
+                        break
+            if nextMove is None:
+                break
+            line.append(nextMove)
+            gs.makeMove(nextMove)
+        for i in range(len(line)):
+            gs.undoMove()
+        return line
+
+    def negamax(self, gs, moves, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes > self.nodeLimit:
+            self.stopped = True
+        if self.stopped:
+            return 0
+        if depth == 0:
+            return scoreBoard(gs) if gs.whiteToMove else -scoreBoard(gs)
+        hashMoveID = -1
+        if self.table is not None:
+            entry = self.table.get(gs.zobristKey, ply)
+            if entry is not None:
+                entryDepth, entryScore, entryType, hashMoveID = entry
+                if entryDepth >= depth and ply > 0:
+                    if entryType == exact:
+                        return entryScore
+                    if entryType == lowerBound:
+                        alpha = max(alpha, entryScore)
+                    else:
+                        beta = min(beta, entryScore)
+                    if alpha >= beta:
+                        return entryScore
+        if moves is None:
+            moves = gs.getValidMoves()
+        if not moves:
+            return -checkmateScore + ply if gs.isCheckMate else stalemateScore #prefer faster mates
+        hashMove = None
+        for move in moves:
+            if move.moveID == hashMoveID:
+                hashMove = move
+                break
+        if self.orderer is not None:
+            self.orderer.orderMoves(moves, ply, hashMove)
+        elif hashMove is not None:
+            moves.remove(hashMove)
+            moves.insert(0, hashMove)
+        alphaStart = alpha
+        best = -checkmateScore - 1
+        bestMove = None
+        for move in moves:
+            gs.makeMove(move)
+            score = -self.negamax(gs, None, depth - 1, -beta, -alpha, ply + 1)
+            gs.undoMove()
+            if self.stopped:
+                return 0
+            if score > best:
+                best = score
+                bestMove = move
+                if ply == 0:
+                    self.bestMove = move
+            alpha = max(alpha, best)
+            if alpha >= beta: # the opponent will avoid this line
+                if self.orderer is not None:
+                    self.orderer.recordCutoff(move, ply, depth)
+                break
+        if self.table is not None:
+            entryType = upperBound if best <= alphaStart else lowerBound if best >= beta else exact
+            self.table.store(gs.zobristKey, depth, best, entryType, bestMove.moveID, ply)
+        return best
+
+
+""" best move for the side to move in gs, searched to depth plies """
+def findBestMove(gs, depth=2, validMoves=None, orderer=None):
+    return Search(orderer).findBestMove(gs, depth, validMoves)[0]
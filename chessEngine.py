@@ -3,8 +3,128 @@ This class will be responsible for storing all the information about the current
 It will also be responsible for determining the valid moves at the current state. It will also keep the move log.
 """
 
+import random
+from array import array
+
 import numpy as np
 
+# integer piece codes used for compact position records - 0 is an empty square
+pieceCodes = ["--",
+              "wp", "wr", "wn", "wu", "wb", "wq", "wk", "we", "wc", "wh", "wa", "wm",
+              "bp", "br", "bn", "bu", "bb", "bq", "bk", "be", "bc", "bh", "ba", "bm"]
+pieceIndex = {piece: code for code, piece in enumerate(pieceCodes)}
+pieceArray = np.array(pieceCodes) # lookup table to turn a code array back into a board
+sortedPieces = np.sort(pieceArray) # with sortedCodes used to turn a board into a code array
+sortedCodes = np.array([pieceIndex[piece] for piece in sortedPieces], dtype=np.uint8)
+
+positionSize = 104 # bytes: 100 squares, flags, en passant square, two king squares
+noSquare = 255 # marks a missing en passant square in a record
+squares = [(r, c) for r in range(10) for c in range(10)] # shared (row, col) tuples by square index
+# castling flag -> (square index, piece) of the king and the rook that have to be on their home squares
+castleHomes = {'K': [(85, 'wk'), (89, 'wr')], 'Q': [(85, 'wk'), (80, 'wr')],
+               'k': [(15, 'bk'), (19, 'br')], 'q': [(15, 'bk'), (10, 'br')]}
+
+# material values in centipawns, the king is not counted
+pieceValues = {'p': 100, 'r': 500, 'n': 300, 'u': 450, 'b': 300, 'q': 900, 'k': 0,
+               'e': 350, 'c': 550, 'h': 700, 'a': 600, 'm': 550}
+codeValues = [0] + [(1 if piece[0] == 'w' else -1) * pieceValues[piece[1]] for piece in pieceCodes[1:]]
+
+# Zobrist keys (63 bit so they fit into a signed array slot) - fixed seed so hashes are stable between runs
+zobristRandom = random.Random(1010)
+zobristPieces = [[0]*100] + [[zobristRandom.getrandbits(63) for sq in range(100)] for piece in pieceCodes[1:]]
+zobristCastle = [zobristRandom.getrandbits(63) for mask in range(16)]
+zobristEnpassant = [0] + [zobristRandom.getrandbits(63) for sq in range(100)] # index 0: no en passant square
+zobristSide = zobristRandom.getrandbits(63) # xored in when black is to move
+zobristArray = np.array(zobristPieces, dtype=np.int64) # same piece keys for hashing whole boards at once
+codeValueArray = np.array(codeValues, dtype=np.int64)
+squareIndices = np.arange(100)
+
+maxPly = 512 # initial size of the undo stack, it doubles if a game gets longer
+
+seeValues = dict(pieceValues, k=10000) # for static exchange evaluation, capturing the king ends every exchange
+
+# piece movement definitions, compiled into the per-square tables below when the module loads and used by
+# GameState.pieceMoves. Every piece is a list of (rule, directions) parts, generated in this order:
+#   leap     jump by each offset to any square not holding an own piece
+#   slide    ride along each direction until blocked, capturing the first enemy piece met
+#   skip     ride along each direction onto empty squares only, passing over at most one own piece
+#   capture  ride along each direction over empty squares, only to capture the first enemy piece met
+#   side     ride along each direction onto empty squares only, capturing from each of them beside the
+#            line - see sideSteps
+# pawns and castling depend on the side to move and the game history and keep their own generators
+orthogonals = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+diagonals = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+knightOffsets = [(2, -1), (2, 1), (-2, -1), (-2, 1), (1, 2), (-1, 2), (1, -2), (-1, -2)]
+pieceDefinitions = {
+    'r': [('slide', orthogonals)],
+    'n': [('leap', knightOffsets)],
+    'u': [('leap', knightOffsets + [(3, 0), (-3, 0), (0, 3), (0, -3)])],
+    'b': [('slide', diagonals)],
+    'q': [('slide', diagonals + orthogonals)],
+    'k': [('leap', [(1, 0), (1, 1), (1, -1), (0, 1), (0, -1), (-1, 0), (-1, 1), (-1, -1)])],
+    'e': [('leap', [(3, 1), (3, -1), (3, 2), (3, -2), (-3, 1), (-3, -1), (-3, 2), (-3, -2),
+                    (1, 3), (-1, 3), (2, 3), (-2, 3), (1, -3), (-1, -3), (2, -3), (-2, -3)])],
+    'c': [('skip', diagonals), ('capture', [(1, 0), (-1, 0), (0, -1), (0, 1)])], # moves like a bishop, captures like a rook
+    'h': [('side', orthogonals)], # hammer
+    'a': [('side', diagonals)], # arrow
+    'm': [('skip', orthogonals), ('capture', [(1, 1), (-1, 1), (1, -1), (-1, -1)])]} # moves like a rook, captures like a bishop
+
+
+def onBoard(r, c):
+    return 0 <= r < 10 and 0 <= c < 10
+
+
+""" side capture steps: one step further in row or in column for diagonals, both neighbours across the line otherwise """
+def sideSteps(dr, dc):
+    if dr and dc:
+        return [(dr, 0), (0, dc)]
+    return [(-abs(dc), -abs(dr)), (abs(dc), abs(dr))]
+
+
+""" squares along (dr, dc) from (r,c) as indices, for side rays with the indices of their side squares """
+def compileRay(rule, r, c, dr, dc):
+    ray = []
+    row, col = r + dr, c + dc
+    while onBoard(row, col):
+        if rule == 'side':
+            ray.append((row*10 + col, [(row+sr)*10 + col+sc for sr, sc in sideSteps(dr, dc) if onBoard(row+sr, col+sc)]))
+        else:
+            ray.append(row*10 + col)
+        row += dr ; col += dc
+    return ray
+
+
+""" (rule, table) per part, table[square] holds the jump targets or the non-empty rays from that square """
+def compilePiece(parts):
+    compiled = []
+    for rule, directions in parts:
+        if rule == 'leap':
+            table = [[(r+dr)*10 + c+dc for dr, dc in directions if onBoard(r+dr, c+dc)] for r, c in squares]
+        else:
+            table = [[ray for ray in (compileRay(rule, r, c, dr, dc) for dr, dc in directions) if ray]
+                     for r, c in squares]
+        compiled.append((rule, table))
+    return compiled
+
+movementTables = {kind: compilePiece(parts) for kind, parts in pieceDefinitions.items()}
+
+# the same definitions read backwards for attackersTo
+leapSources = {} # kind -> per square the squares it captures on that square from
+lineCapturers = {} # direction -> kinds capturing the first piece met walking from the target in that direction
+sideCapturers = [] # (direction of travel, side step, kind)
+for kind, parts in pieceDefinitions.items():
+    for rule, directions in parts:
+        if rule == 'leap':
+            sources = leapSources.setdefault(kind, [[] for sq in squares])
+            for (r, c), found in zip(squares, sources):
+                found += [(r-dr, c-dc) for dr, dc in directions if onBoard(r-dr, c-dc) and (r-dr, c-dc) not in found]
+        elif rule in ('slide', 'capture'):
+            for dr, dc in directions:
+                lineCapturers[-dr, -dc] = lineCapturers.get((-dr, -dc), '') + kind
+        elif rule == 'side':
+            sideCapturers += [((dr, dc), step, kind) for dr, dc in directions for step in sideSteps(dr, dc)]
+
+
 class GameState():
     def __init__(self):
         
@@ -25,18 +145,176 @@ class GameState():
         self.whiteKingLocation = (8, 5) #Location of the white king
         self.blackKingLocation = (1, 5) #Location of the black king
         # dictionary to keep track of piece function names 
-        self.moveFunctions = {'p': self.pawnMoves, 'r': self.rookMoves, 'n': self.knightMoves, 'u': self.unicornMoves, 
-                            'b': self.bishopMoves, 'q': self.queenMoves, 'k': self.kingMoves, 'e': self.eagleMoves, 
-                            'c': self.cardinalMoves, 'h': self.hammerMoves, 'a': self.arrowMoves, 'm': self.ministerMoves}
+        self.moveFunctions = dict.fromkeys(pieceDefinitions, self.pieceMoves) # one table driven generator
+        self.moveFunctions['p'] = self.pawnMoves
         self.isStaleMate = False
         self.isCheckMate = False
         self.enpassantSquare = () #track fields where enpassant is possible
         self.currentCastleRights = castleRights(True, True, True, True)
-        self.castleRightsLog = [castleRights(self.currentCastleRights.wks, self.currentCastleRights.bks, 
-                                            self.currentCastleRights.wqs, self.currentCastleRights.bqs)]
+        # undo stack with three packed integers per ply: captured piece code | castle rights mask << 5 |
+        # en passant square + 1 << 9, the zobrist key and the material score before the move
+        self.undoStack = array('q', bytes(8 * 3 * maxPly))
+        self.accumulator = None # optional nnue.Accumulator, updated by makeMove and undoMove
+        self.resetUndoStack()
+
+    """ Empty the undo stack and compute hash and material of the current position from scratch """
+    def resetUndoStack(self):
+        self.undoPly = 0
+        codes = self.boardCodes()
+        key = int(np.bitwise_xor.reduce(zobristArray[codes, squareIndices]))
+        key ^= 0 if self.whiteToMove else zobristSide
+        material = int(codeValueArray[codes].sum())
+        key ^= zobristCastle[self.currentCastleRights.mask()]
+        if self.enpassantSquare:
+            key ^= zobristEnpassant[self.enpassantSquare[0]*10 + self.enpassantSquare[1] + 1]
+        self.zobristKey = key
+        self.materialScore = material #white minus black
+        if self.accumulator is not None:
+            self.accumulator.refresh(self)
+
+    """ the board as a flat array of 100 piece codes """
+    def boardCodes(self):
+        return sortedCodes[np.searchsorted(sortedPieces, self.board.ravel())]
     
+    """ 
+    Write the position (not the move log) into a compact positionSize byte record.
+    Writes into record at offset if a writable buffer is given, otherwise into a new bytearray
+    """
+    def packPosition(self, record=None, offset=0):
+        if record is None:
+            record = bytearray(positionSize)
+        record[offset:offset+100] = self.boardCodes().tobytes()
+        record[offset+100] = self.whiteToMove | self.currentCastleRights.mask() << 1
+        record[offset+101] = self.enpassantSquare[0]*10 + self.enpassantSquare[1] if self.enpassantSquare else noSquare
+        record[offset+102] = self.whiteKingLocation[0]*10 + self.whiteKingLocation[1]
+        record[offset+103] = self.blackKingLocation[0]*10 + self.blackKingLocation[1]
+        return record
+
+    """ Load a record made by packPosition (any buffer or memoryview) into this GameState, clearing the move log """
+    def setPosition(self, record):
+        self.board = pieceArray[np.frombuffer(record, dtype=np.uint8, count=100)].reshape(10, 10)
+        flags = record[100]
+        self.whiteToMove = bool(flags & 1)
+        self.currentCastleRights.setMask(flags >> 1)
+        self.enpassantSquare = squares[record[101]] if record[101] != noSquare else ()
+        self.whiteKingLocation = squares[record[102]]
+        self.blackKingLocation = squares[record[103]]
+        self.moveLog = []
+        self.isCheckMate = False
+        self.isStaleMate = False
+        self.resetUndoStack()
+
+    """ 
+    Text notation of the position, like FEN for 10x10: ranks 10 to 1 separated by '/', white pieces upper case,
+    digits for empty squares, then side to move, castling rights (KQkq or -) and en passant square (or -).
+    Start position: echammahce/rnubqkbunr/pppppppppp/10/10/10/10/PPPPPPPPPP/RNUBQKBUNR/ECHAMMAHCE w KQkq -
+    """
+    def getFen(self):
+        ranks = []
+        for row in self.board:
+            rank = ""
+            empty = 0
+            for piece in row:
+                if piece == "--":
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += piece[1].upper() if piece[0] == 'w' else piece[1]
+            ranks.append(rank + (str(empty) if empty else ""))
+        cr = self.currentCastleRights
+        # a right is kept after its rook was captured, but it can not be used any more - leave it out
+        castling = "".join(flag for flag, right in (('K', cr.wks), ('Q', cr.wqs), ('k', cr.bks), ('q', cr.bqs))
+                           if right and all(self.board[squares[sq]] == piece for sq, piece in castleHomes[flag]))
+        enpassant = Move.colsToFiles[self.enpassantSquare[1]] + Move.rowsToRanks[self.enpassantSquare[0]] \
+            if self.enpassantSquare else "-"
+        return " ".join(["/".join(ranks), 'w' if self.whiteToMove else 'b', castling or "-", enpassant])
+
+    """ Load a position in the notation of getFen, raises ValueError for malformed text """
+    def setFen(self, fen):
+        fields = fen.split()
+        if len(fields) != 4:
+            raise ValueError("expected 4 fields: placement, side to move, castling, en passant")
+        ranks = fields[0].split("/")
+        if len(ranks) != 10:
+            raise ValueError("expected 10 ranks")
+        record = bytearray(positionSize)
+        kings = {}
+        for row, rank in enumerate(ranks):
+            col = 0
+            digits = ""
+            for char in rank + " ": # trailing space flushes a final run of empty squares
+                if char.isdigit():
+                    digits += char
+                    continue
+                if digits:
+                    col += int(digits)
+                    digits = ""
+                if char == " ":
+                    break
+                piece = ('w' if char.isupper() else 'b') + char.lower()
+                if piece not in pieceIndex or col >= 10:
+                    raise ValueError("bad rank %r" % rank)
+                record[row*10 + col] = pieceIndex[piece]
+                if piece[1] == 'k':
+                    kings.setdefault(piece, []).append(row*10 + col)
+                col += 1
+            if col != 10:
+                raise ValueError("rank %r does not have 10 squares" % rank)
+        if any(record[sq] in (pieceIndex['wp'], pieceIndex['bp']) for sq in list(range(10)) + list(range(90, 100))):
+            raise ValueError("pawns cannot stand on the first or last rank")
+        if len(kings.get('wk', [])) != 1 or len(kings.get('bk', [])) != 1:
+            raise ValueError("each side needs exactly one king")
+        if fields[1] not in ('w', 'b') or not set(fields[2]) <= set("KQkq-"):
+            raise ValueError("bad side to move or castling field")
+        castling = fields[2]
+        for flag, homes in castleHomes.items():
+            if flag in castling and any(record[sq] != pieceIndex[piece] for sq, piece in homes):
+                raise ValueError("castling flag %s without king and rook on their home squares" % flag)
+        mask = ('K' in castling) | ('k' in castling) << 1 | ('Q' in castling) << 2 | ('q' in castling) << 3
+        record[100] = (fields[1] == 'w') | mask << 1
+        if fields[3] == "-":
+            record[101] = noSquare
+        elif fields[3][0] in Move.filesToCols and fields[3][1:] in Move.ranksToRows:
+            col = Move.filesToCols[fields[3][0]]
+            # the square a pawn of the side not to move just passed with a two square advance
+            row, pawn, step = (3, 'bp', 1) if fields[1] == 'w' else (6, 'wp', -1)
+            if Move.ranksToRows[fields[3][1:]] != row or record[row*10 + col] or record[(row - step)*10 + col] \
+                    or record[(row + step)*10 + col] != pieceIndex[pawn]:
+                raise ValueError("en passant square %r does not follow a two square pawn advance" % fields[3])
+            record[101] = row*10 + col
+        else:
+            raise ValueError("bad en passant square %r" % fields[3])
+        record[102] = kings['wk'][0]
+        record[103] = kings['bk'][0]
+        probe = GameState()
+        probe.setPosition(record)
+        probe.whiteToMove = not probe.whiteToMove
+        if probe.inCheck():
+            raise ValueError("the side not to move is in check")
+        self.setPosition(record)
+
     # Will not work for casteling, en passant capture and pawn promotion
     def makeMove(self, move):
+        # push the irreversible state of this ply onto the undo stack
+        ply = 3 * self.undoPly
+        if ply == len(self.undoStack):
+            self.undoStack.extend(self.undoStack) #double the stack, old slots are overwritten anyway
+        oldMask = self.currentCastleRights.mask()
+        oldEnpassant = self.enpassantSquare[0]*10 + self.enpassantSquare[1] + 1 if self.enpassantSquare else 0
+        captured = pieceIndex[move.captured_piece]
+        self.undoStack[ply] = captured | oldMask << 5 | oldEnpassant << 9
+        self.undoStack[ply+1] = self.zobristKey
+        self.undoStack[ply+2] = self.materialScore
+        self.undoPly += 1
+
+        start = move.startRow*10 + move.startCol
+        end = move.endRow*10 + move.endCol
+        moved = pieceIndex[move.moved_piece]
+        key = self.zobristKey ^ zobristSide ^ zobristPieces[moved][start]
+        material = self.materialScore - codeValues[captured]
+
         self.board[move.startRow, move.startCol] = "--" #leave behind blank space
         self.board[move.endRow, move.endCol] = move.moved_piece #move piece to new location
         self.moveLog.append(move) #track move
@@ -49,25 +327,39 @@ class GameState():
         #pawn promotion
         if move.isPawnPromotion:
             self.board[move.endRow, move.endCol] = move.moved_piece[0] + 'q'
+            promoted = pieceIndex[move.moved_piece[0] + 'q']
+            key ^= zobristPieces[promoted][end]
+            material += codeValues[promoted] - codeValues[moved]
+        else:
+            key ^= zobristPieces[moved][end]
         # en passant capture
         if move.isEnPassant:
             self.board[move.startRow, move.endCol] = "--"
+            key ^= zobristPieces[captured][move.startRow*10 + move.endCol]
+        else:
+            key ^= zobristPieces[captured][end]
 
         # update enpassant variable - if moved piece is 2pawn advance - enpassant possible
         if move.moved_piece[1] == 'p' and abs(move.startRow - move.endRow) == 2:
             #this is the square where en passant is possible
             self.enpassantSquare = ((move.startRow+move.endRow)//2, move.endCol)
+            key ^= zobristEnpassant[oldEnpassant] ^ zobristEnpassant[(start + end)//2 + 1]
         else:
             self.enpassantSquare = ()
+            key ^= zobristEnpassant[oldEnpassant]
         
         # Caslting
         if move.isCastling:
             if int(move.endCol - move.startCol) == 3: #kingside castle
+                rook = pieceIndex[self.board[move.endRow, move.endCol+1]]
+                key ^= zobristPieces[rook][end+1] ^ zobristPieces[rook][end-1]
                 #move rook
                 self.board[move.endRow, move.endCol-1] = self.board[move.endRow, move.endCol+1] 
                 #remove it from old square
                 self.board[move.endRow, move.endCol+1] = "--"        
             else: #queenside castle
+                rook = pieceIndex[self.board[move.endRow, move.endCol-1]]
+                key ^= zobristPieces[rook][end-1] ^ zobristPieces[rook][end+1]
                 #move rook
                 self.board[move.endRow, move.endCol+1] = self.board[move.endRow, move.endCol-1] 
                 #remove it from old square
@@ -75,14 +367,21 @@ class GameState():
 
         # Update Castling Rights - when Rook or king is moved
         self.updateCastleRights(move)
-        self.castleRightsLog.append(castleRights(self.currentCastleRights.wks, self.currentCastleRights.bks, 
-                                    self.currentCastleRights.wqs, self.currentCastleRights.bqs))
+        self.zobristKey = key ^ zobristCastle[oldMask] ^ zobristCastle[self.currentCastleRights.mask()]
+        self.materialScore = material
+        if self.accumulator is not None: #incremental update of the neural evaluation
+            self.accumulator.makeMove(move)
 
     def undoMove(self):
         if len(self.moveLog) != 0:
             move = self.moveLog.pop() #gets last element and removes
+            # pop the irreversible state of this ply from the undo stack
+            self.undoPly -= 1
+            ply = 3 * self.undoPly
+            packed = self.undoStack[ply]
+            captured = pieceCodes[packed & 31]
             self.board[move.startRow, move.startCol] = move.moved_piece #put moved piece back at start
-            self.board[move.endRow, move.endCol] = move.captured_piece #put catured piece back in place
+            self.board[move.endRow, move.endCol] = captured #put catured piece back in place
             self.whiteToMove = not self.whiteToMove
             #if king moved, update king location
             if move.moved_piece == 'wk':
@@ -92,11 +391,7 @@ class GameState():
             #undo enpassant
             if move.isEnPassant:
                 self.board[move.endRow, move.endCol] = "--"
-                self.board[move.startRow, move.endCol] = move.captured_piece
-                self.enpassantSquare = (move.endRow, move.endCol)
-            #undo 2square pawn advance
-            if move.moved_piece[1] == 'p' and abs(move.startRow - move.endRow) == 2:
-                self.enpassantSquare = ()
+                self.board[move.startRow, move.endCol] = captured
             #undo caslting move
             if move.isCastling:
                 if move.endCol - move.startCol == 3: #undo kingside
@@ -105,10 +400,14 @@ class GameState():
                 else: #undo queenside
                     self.board[move.endRow, move.endCol-1] = self.board[move.endRow, move.endCol+1]
                     self.board[move.endRow, move.endCol+1] = "--"
-            #undo castling rights - restore old rights before last move
-            self.castleRightsLog.pop()
-            self.currentCastleRights = castleRights(self.castleRightsLog[-1].wks, self.castleRightsLog[-1].bks,
-                                                    self.castleRightsLog[-1].wqs, self.castleRightsLog[-1].bqs)
+            #restore castling rights, en passant square, hash and material from before the move
+            self.currentCastleRights.setMask(packed >> 5 & 15)
+            enpassant = packed >> 9
+            self.enpassantSquare = squares[enpassant - 1] if enpassant else ()
+            self.zobristKey = self.undoStack[ply+1]
+            self.materialScore = self.undoStack[ply+2]
+            if self.accumulator is not None:
+                self.accumulator.undoMove()
     
 
     """ Update the rights for castling, not if it is possible """    
@@ -138,9 +437,6 @@ class GameState():
     def getValidMoves(self):
         # generate all possible moves, make them all,
         # then generate all opponent moves and check if they attack king
-        temp_enpasssant = self.enpassantSquare #temporary en passant store for undo moves
-        temp_castleRights = castleRights(self.currentCastleRights.wks, self.currentCastleRights.bks, 
-                            self.currentCastleRights.wqs, self.currentCastleRights.bqs) #temporary caslting
         moves =  self.getPossibleMoves()
         if self.whiteToMove:
             self.getCastleMoves(self.whiteKingLocation[0], self.whiteKingLocation[1], moves)
@@ -148,7 +444,6 @@ class GameState():
             self.getCastleMoves(self.blackKingLocation[0], self.blackKingLocation[1], moves)
         for i in range(len(moves)-1, -1, -1):
             self.makeMove(moves[i]) #make the move
-            oppMoves = self.getPossibleMoves() #get all opponents moves
             self.whiteToMove = not self.whiteToMove # again switch turns
             if self.inCheck():
                 moves.remove(moves[i]) #remove move that ends in check
@@ -157,16 +452,12 @@ class GameState():
         if len(moves) == 0: #either checkmate or stalemate
             if self.inCheck():
                 self.isCheckMate = True
-                print('CHECKMATE')
             else:
-                self.isStaleMate = True 
-                print('STALEMATE')
+                self.isStaleMate = True
         else: #reset checkmate, stalemate
             self.isCheckMate = False
             self.isStaleMate = False
 
-        self.enpassantSquare = temp_enpasssant #fix undo enpassant undo issue 
-        self.currentCastleRights = temp_castleRights #fix undo castling undo issue   
         return moves
 
     """ Determine if the King is in Check """
@@ -178,6 +469,9 @@ class GameState():
 
     """ is an piece attacking the piece on (r,c)? """
     def squareAttacked(self, r, c):
+        if self.board[r, c][0] == ('w' if self.whiteToMove else 'b'):
+            # opponent moves can only end on one of our pieces by capturing it - use the attack tables
+            return len(self.attackersTo(r, c, not self.whiteToMove)) > 0
         self.whiteToMove = not self.whiteToMove #switch to opponents view
         oppMoves = self.getPossibleMoves()
         self.whiteToMove = not self.whiteToMove #switch turns back
@@ -187,24 +481,103 @@ class GameState():
         return False
 
     
+    """ 
+    Pieces of one colour that can capture on (r,c), as (value, row, col) tuples. 
+    Works from the target square backwards, so sliders, hammers and arrows are looked up along
+    the lines they travel and not along the line to the target.
+    """
+    def attackersTo(self, r, c, white):
+        board = self.board
+        colour = 'w' if white else 'b'
+        found = {}
+        # pawns capture diagonally forward
+        pr = r + 1 if white else r - 1
+        if 0 <= pr < 10:
+            for pc in (c-1, c+1):
+                if 0 <= pc < 10 and board[pr, pc] == colour + 'p':
+                    found[pr, pc] = 'p'
+        # leapers
+        for kind, sources in leapSources.items():
+            for sq in sources[r*10 + c]:
+                if board[sq] == colour + kind:
+                    found[sq] = kind
+        # first piece on a line: sliders, and pieces with capture-only lines like cardinal and minister
+        for (dr, dc), kinds in lineCapturers.items():
+            row, col = r + dr, c + dc
+            while 0 <= row < 10 and 0 <= col < 10:
+                piece = board[row, col]
+                if piece != "--":
+                    if piece[0] == colour and piece[1] in kinds:
+                        found[row, col] = piece[1]
+                    break
+                row += dr ; col += dc
+        # side capturers like hammers and arrows capture from an empty square they travelled to, off their line
+        for (dr, dc), (sr, sc), kind in sideCapturers:
+            row, col = r - sr, c - sc
+            if not (0 <= row < 10 and 0 <= col < 10) or board[row, col] != "--":
+                continue
+            row -= dr ; col -= dc # walk back along the line of travel to find the piece
+            while 0 <= row < 10 and 0 <= col < 10:
+                piece = board[row, col]
+                if piece != "--":
+                    if piece == colour + kind:
+                        found[row, col] = kind
+                    break
+                row -= dr ; col -= dc
+        return [(seeValues[kind], sq[0], sq[1]) for sq, kind in found.items()]
+
+    """
+    Static exchange evaluation: material gain in centipawns for the side making move, when both sides
+    keep recapturing on the target square with their least valuable attacker and may stop at any point.
+    The board is changed in place while resolving and restored afterwards. Promotions are not considered
+    """
+    def staticExchange(self, move):
+        board = self.board
+        r, c = move.endRow, move.endCol
+        changed = [((move.startRow, move.startCol), board[move.startRow, move.startCol]), ((r, c), board[r, c])]
+        if move.isEnPassant:
+            changed.append(((move.startRow, c), board[move.startRow, c]))
+            board[move.startRow, c] = "--"
+        board[move.startRow, move.startCol] = "--"
+        board[r, c] = move.moved_piece
+        gain = [seeValues[move.captured_piece[1]] if move.captured_piece != "--" else 0]
+        onSquare = seeValues[move.moved_piece[1]] # value of the piece that can be captured next
+        white = move.moved_piece[0] != 'w'
+        while True:
+            attackers = self.attackersTo(r, c, white)
+            if not attackers:
+                break
+            value, row, col = min(attackers)
+            gain.append(onSquare - gain[-1])
+            changed.append(((row, col), board[row, col]))
+            board[r, c] = board[row, col]
+            board[row, col] = "--"
+            onSquare = value
+            white = not white
+        for sq, piece in reversed(changed):
+            board[sq] = piece
+        # every side can stop capturing if continuing loses material
+        while len(gain) > 1:
+            last = gain.pop()
+            gain[-1] = -max(-gain[-1], last)
+        return gain[0]
+
     """ Get All Possible moves for a player (not considering checks) """
     def getPossibleMoves(self):
         moves = []
-        for r in range(len(self.board)): # number of rows
-            for c in range(len(self.board[r])): # number of colums (correct implementation for 2dim list)
-
-                turn = self.board[r,c][0] # colour of piece on square - need to check it?
-                if (turn == 'w' and self.whiteToMove) or (turn == 'b' and not self.whiteToMove):
-                    piece = self.board[r,c][1]
-                    self.moveFunctions[piece](r, c, moves) #calls appropriate move functions current pos
-
+        cells = self.board.ravel().tolist() # plain strings are much faster to look at than numpy elements
+        turn = 'w' if self.whiteToMove else 'b'
+        for sq, piece in enumerate(cells):
+            if piece[0] == turn:
+                r, c = squares[sq]
+                self.moveFunctions[piece[1]](r, c, moves, cells) #calls appropriate move functions current pos
         return moves
     
 
     """
     Generate all possible moves for each piece
     """
-    def pawnMoves(self, r, c, moves):
+    def pawnMoves(self, r, c, moves, cells=None): # cells unused, pawns look at the board directly
         if self.whiteToMove: #handle white pawn moves first
             if self.board[r-1, c] == "--":
                 moves.append(Move((r,c), (r-1, c), self.board))
@@ -242,165 +615,55 @@ class GameState():
 
 
 
-    def rookMoves(self, r, c, moves):
-        """ movement down """
-        row = r + 1 #iteration variable
-        while row < 10:
-            # black rook captures white piece:
-            bcapt = (self.board[row, c][0] == 'w' and not self.whiteToMove)
-            # white rook captures black piece:
-            wcapt = (self.board[row, c][0] == 'b' and self.whiteToMove) 
-            if self.board[row, c] == "--": # check if empty square to move
-                moves.append(Move((r,c), (row, c), self.board))
-            elif wcapt or bcapt:
-                moves.append(Move((r,c), (row,c), self.board))
-                break
-            else: # if none of the above - one of our pieces blocks the way
-                break
-            row += 1
-        """ movement up """
-        row = r - 1 # new iteration variable
-        while row >= 0:
-            # black rook captures white piece:
-            bcapt = (self.board[row, c][0] == 'w' and not self.whiteToMove)
-            # white rook captures black piece:
-            wcapt = (self.board[row, c][0] == 'b' and self.whiteToMove)
-            if self.board[row, c] == "--": # check if empty square to move
-                moves.append(Move((r,c), (row, c), self.board))
-            elif wcapt or bcapt:
-                moves.append(Move((r,c), (row,c), self.board))
-                break
-            else: # if none of the above - one of our pieces blocks the way
-                break
-            row -= 1
-        """ movement to the right """
-        col = c + 1 # interation variable
-        while col < 10:
-            # black rook captures white piece:
-            bcapt = (self.board[r, col][0] == 'w' and not self.whiteToMove)
-            # white rook captures black piece:
-            wcapt = (self.board[r, col][0] == 'b' and self.whiteToMove)
-            if self.board[r, col] == "--": #empty square to move to
-                moves.append(Move((r,c), (r,col), self.board))
-            elif wcapt or bcapt:
-                moves.append(Move((r,c), (r,col), self.board))
-                break
-            else:
-                break
-            col += 1
-        """ movement to the left """
-        col = c - 1 #new iteration variable
-        while col >= 0:
-            # black rook captures white piece:
-            bcapt = (self.board[r, col][0] == 'w' and not self.whiteToMove)
-            # white rook captures black piece:
-            wcapt = (self.board[r, col][0] == 'b' and self.whiteToMove)
-            if self.board[r, col] == "--": #empty square to move to
-                moves.append(Move((r,c), (r,col), self.board))
-            elif wcapt or bcapt:
-                moves.append(Move((r,c), (r,col), self.board))
-                break
-            else:
-                break
-            col -= 1
-    
-    """ function to find possible moves from move reach list (for knights etc.) """
-    def moveListSeach(self, r, c, moves, moveList):
-        for square in moveList:
-            if square[0] in range(10) and square[1] in range(10):
-                # white piece
-                if self.whiteToMove:
-                    if self.board[square][0] != 'w':
-                        moves.append(Move((r,c), square, self.board))
-                    if self.board[square][0] != 'w':
-                        moves.append(Move((r,c), square, self.board))
-                # black piece
-                else:
-                    if self.board[square][0] != 'b':
-                        moves.append(Move((r,c), square, self.board))
-                    if self.board[square][0] != 'b':
-                        moves.append(Move((r,c), square, self.board))
-
-    
-    def knightMoves(self, r, c, moves):
-        # list possible locations for knight to jump to - reach:
-        reach = [(r+2, c-1), (r+2, c+1), (r-2, c-1), (r-2, c+1), 
-                (r+1, c+2), (r-1, c+2), (r+1, c-2), (r-1, c-2)]
-        self.moveListSeach(r, c, moves, reach)
-
-
-    def bishopMoves(self, r, c, moves):
-        """ move up to the right """
-        row = r+1 ; col = c+1 #iteration variables
-        while row in range(10) and col in range(10):
-            # black bishop captures white piece:
-            bcapt = (self.board[row, col][0] == 'w' and not self.whiteToMove)
-            # white rook captures black piece:
-            wcapt = (self.board[row, col][0] == 'b' and self.whiteToMove)
-            if self.board[row,col] == "--": # empty squares ok to move
-                moves.append(Move((r,c), (row,col), self.board))
-                row += 1 ; col+= 1
-                continue
-            elif bcapt or wcapt:
-                moves.append(Move((r,c), (row,col), self.board))
-                break
-            else:
-                break
-        """ move up to the left """
-        row = r+1 ; col = c-1 #iteration variables
-        while row in range(10) and col in range(10):
-            # black bishop captures white piece:
-            bcapt = (self.board[row, col][0] == 'w' and not self.whiteToMove)
-            # white rook captures black piece:
-            wcapt = (self.board[row, col][0] == 'b' and self.whiteToMove)
-            if self.board[row,col] == "--": # empty squares ok to move
-                moves.append(Move((r,c), (row,col), self.board))
-                row += 1 ; col-= 1
-                continue
-            elif bcapt or wcapt:
-                moves.append(Move((r,c), (row,col), self.board))
-                break
-            else:
-                break
-        """ move down to the right """
-        row = r-1 ; col = c+1 #iteration variables
-        while row in range(10) and col in range(10):
-            # black bishop captures white piece:
-            bcapt = (self.board[row, col][0] == 'w' and not self.whiteToMove)
-            # white rook captures black piece:
-            wcapt = (self.board[row, col][0] == 'b' and self.whiteToMove)
-            if self.board[row,col] == "--": # empty squares ok to move
-                moves.append(Move((r,c), (row,col), self.board))
-                row -= 1 ; col += 1
-                continue
-            elif bcapt or wcapt:
-                moves.append(Move((r,c), (row,col), self.board))
-                break
-            else:
-                break
-        """ move down to the left """
-        row = r-1 ; col = c-1 #iteration variables
-        while row in range(10) and col in range(10):
-            # black bishop captures white piece:
-            bcapt = (self.board[row, col][0] == 'w' and not self.whiteToMove)
-            # white rook captures black piece:
-            wcapt = (self.board[row, col][0] == 'b' and self.whiteToMove)
-            if self.board[row,col] == "--": # empty squares ok to move
-                moves.append(Move((r,c), (row,col), self.board))
-                row -= 1 ; col -= 1
-                continue
-            elif bcapt or wcapt:
-                moves.append(Move((r,c), (row,col), self.board))
-                break
-            else:
-                break
-
-
-
-    def queenMoves(self, r, c, moves):
-        # queen moves like a bishop + rook:
-        self.bishopMoves(r, c, moves)
-        self.rookMoves(r, c, moves)
+    """ moves of every piece except pawns from the compiled movementTables, cells is the board as a flat list """
+    def pieceMoves(self, r, c, moves, cells=None):
+        board = self.board
+        if cells is None:
+            cells = board.ravel().tolist()
+        own, enemy = ('w', 'b') if self.whiteToMove else ('b', 'w')
+        start = (r, c)
+        sq = r*10 + c
+        for rule, table in movementTables[cells[sq][1]]:
+            if rule == 'leap':
+                for target in table[sq]:
+                    if cells[target][0] != own:
+                        moves.append(Move(start, squares[target], board))
+            elif rule == 'slide':
+                for ray in table[sq]:
+                    for target in ray:
+                        colour = cells[target][0]
+                        if colour != own:
+                            moves.append(Move(start, squares[target], board))
+                        if colour != '-':
+                            break
+            elif rule == 'skip':
+                for ray in table[sq]:
+                    skipped = False
+                    for target in ray:
+                        colour = cells[target][0]
+                        if colour == '-':
+                            moves.append(Move(start, squares[target], board))
+                        elif colour == own and not skipped: # pass over one own piece
+                            skipped = True
+                        else:
+                            break
+            elif rule == 'capture':
+                for ray in table[sq]:
+                    for target in ray:
+                        colour = cells[target][0]
+                        if colour == enemy:
+                            moves.append(Move(start, squares[target], board))
+                        if colour != '-':
+                            break
+            else: # side
+                for ray in table[sq]:
+                    for target, sides in ray:
+                        if cells[target] != "--":
+                            break
+                        moves.append(Move(start, squares[target], board))
+                        for side in sides:
+                            if cells[side][0] == enemy:
+                                moves.append(Move(start, squares[side], board))
 
     """ generate valid moves for castling """
     def getCastleMoves(self, r, c, moves):
@@ -429,297 +692,6 @@ class GameState():
                 moves.append(Move((r,c), (r,c-4), self.board, isCastle=True))
 
 
-    def kingMoves(self, r, c, moves):
-        # list with square the king can reach
-        reach = [(r+1, c), (r+1,c+1), (r+1,c-1), (r,c+1), (r,c-1),
-                (r-1,c), (r-1,c+1), (r-1,c-1)]
-        self.moveListSeach(r, c, moves, reach)
-
-        # castling should not be generated here to avoid recursion
-        
-
-    def unicornMoves(self, r, c, moves):
-        # can do all knight moves plus extra:
-        self.knightMoves(r, c, moves)
-
-        #extra moves:
-        extras = [(r+3, c), (r-3, c), (r, c+3), (r, c-3)]
-        self.moveListSeach(r, c, moves, extras)
-
-
-    def eagleMoves(self, r, c, moves):
-        # define reach of eagle - move 3 forward + 1 or 2 sideways
-        reach = [(r+3, c+1), (r+3, c-1), (r+3, c+2), (r+3, c-2), #up
-                (r-3, c+1), (r-3, c-1), (r-3, c+2), (r-3, c-2),  #down
-                (r+1, c+3), (r-1, c+3), (r+2, c+3), (r-2, c+3),  #right
-                (r+1, c-3), (r-1, c-3), (r+2, c-3), (r-2, c-3)]  #left
-        # same logic as for king, knight and unicorn
-        self.moveListSeach(r, c, moves, reach)
-
-    """ cardinal and minister movement search function """
-    def movingSearch(self, r, c, moves, updateIdx):
-        row, col = updateIdx(r,c) # function that decides movement (index updates)
-        skipped = False
-        while row in range(10) and col in range(10):
-            wskip = self.board[row,col][0] == 'w' and self.whiteToMove # white piece to skip
-            bskip = self.board[row,col][0] == 'b' and not self.whiteToMove # black piece to skip
-            if self.board[row, col] == "--":
-                moves.append(Move((r,c), (row,col), self.board))
-                row, col = updateIdx(row, col)
-            elif (wskip or bskip) and not skipped: #piece possible to be skipped in the way
-                row, col = updateIdx(row, col) #skip piece
-                skipped = True # allow only one piece to be skipped
-            else:
-                break
-    
-    """ cardinal and minister capturing move search functions """
-    def capturingSearch(self, r, c, moves, updateIdx):
-        row, col = updateIdx(r,c)
-        while row in range(10) and col in range(10):
-            wcapt = self.board[row,col][0] == 'b' and self.whiteToMove #white capturing black
-            bcapt = self.board[row,col][0] == 'w' and not self.whiteToMove
-            if self.board[row,col] == "--":
-                row, col = updateIdx(row, col) #just skip empty pieces
-            elif wcapt or bcapt: #capture possible
-                moves.append(Move((r,c), (row,col), self.board))
-                row, col = updateIdx(row,col)
-                break
-            else: #one of our own blocks the way
-                break
-    
-
-    def cardinalMoves(self, r, c, moves):
-        # moves like a bishop, captrues like a rook
-        # can skip one of its own pieces while moving
-        """ moving """
-        # down right
-        updateIdx = lambda r, c : (r+1, c+1)
-        self.movingSearch(r, c, moves, updateIdx)
-        # down left
-        updateIdx = lambda r, c : (r+1, c-1)
-        self.movingSearch(r, c, moves, updateIdx)  
-        # up right
-        updateIdx = lambda r, c : (r-1, c+1)
-        self.movingSearch(r, c, moves, updateIdx) 
-        # up left
-        updateIdx = lambda r, c : (r-1, c-1)
-        self.movingSearch(r, c, moves, updateIdx)
-        """ capturing """
-        # capture down
-        updateIdx = lambda r, c : (r+1, c)
-        self.capturingSearch(r, c, moves, updateIdx)
-        # capture down
-        updateIdx = lambda r, c : (r-1, c)
-        self.capturingSearch(r, c, moves, updateIdx)
-        # capture left
-        updateIdx = lambda r, c : (r, c-1)
-        self.capturingSearch(r, c, moves, updateIdx)
-        # capture right
-        updateIdx = lambda r, c : (r, c+1)
-        self.capturingSearch(r, c, moves, updateIdx)
-    
-
-    def ministerMoves(self, r, c, moves):
-        # moves like a rook, captures like a bishop
-        # can skip one of its own pieces while moving
-        """ moving """
-        # up
-        updateIdx = lambda r, c : (r+1, c)
-        self.movingSearch(r, c, moves, updateIdx)
-        # down
-        updateIdx = lambda r, c : (r-1, c)
-        self.movingSearch(r, c, moves, updateIdx)  
-        # right
-        updateIdx = lambda r, c : (r, c+1)
-        self.movingSearch(r, c, moves, updateIdx) 
-        # left
-        updateIdx = lambda r, c : (r, c-1)
-        self.movingSearch(r, c, moves, updateIdx)
-        """ capturing """
-        # capture down right
-        updateIdx = lambda r, c : (r+1, c+1)
-        self.capturingSearch(r, c, moves, updateIdx)
-        # capture up right
-        updateIdx = lambda r, c : (r-1, c+1)
-        self.capturingSearch(r, c, moves, updateIdx)
-        # capture down left
-        updateIdx = lambda r, c : (r+1, c-1)
-        self.capturingSearch(r, c, moves, updateIdx)
-        # capture up left
-        updateIdx = lambda r, c : (r-1, c-1)
-        self.capturingSearch(r, c, moves, updateIdx)
-        
-
-    def arrowMoves(self, r, c, moves):
-        # arrows move like a bishop and can capture all pieces
-        # on adjacent diagonals to the movement direction
-        """ moving / capturing down right """
-        row = r+1 ; col = c+1
-        while row in range(10) and col in range(10):
-            if self.board[row,col] == "--":
-                moves.append(Move((r,c), (row, col), self.board))
-                # check where we can continue to look
-                if row+1 in range(10):
-                    # determine where white and black can capture
-                    wcaptdown = (self.board[row+1,col][0] == 'b') and self.whiteToMove #capture on lower diag
-                    bcaptdown = (self.board[row+1,col][0] == 'w') and not self.whiteToMove #black captures diag down
-                    if wcaptdown or bcaptdown: #captures on lower diagonal possible
-                        moves.append(Move((r,c), (row+1, col), self.board))
-                if col+1 in range(10):
-                    # determine where white and black can capture
-                    wcaptup = (self.board[row,col+1][0] == 'b') and self.whiteToMove #capture on higher diag
-                    bcaptup = (self.board[row,col+1][0] == 'w') and not self.whiteToMove #black captures diag up
-                    if wcaptup or bcaptup:
-                        moves.append(Move((r,c), (row,col+1), self.board))
-                row += 1 ; col += 1 #update index
-            else: # cannot move to that square - thus also not capture
-                break
-        """ moving / capturing down left """
-        row = r+1 ; col = c-1
-        while row in range(10) and col in range(10):
-            if self.board[row,col] == "--":
-                moves.append(Move((r,c), (row, col), self.board))
-                # check where we can continue to look
-                if row+1 in range(10):
-                    # determine where white and black can capture
-                    wcaptdown = (self.board[row+1,col][0] == 'b') and self.whiteToMove #capture on lower diag
-                    bcaptdown = (self.board[row+1,col][0] == 'w') and not self.whiteToMove #black captures diag down
-                    if wcaptdown or bcaptdown: #captures on lower diagonal possible
-                        moves.append(Move((r,c), (row+1, col), self.board))
-                if col-1 in range(10):
-                    # determine where white and black can capture
-                    wcaptup = (self.board[row,col-1][0] == 'b') and self.whiteToMove #capture on higher diag
-                    bcaptup = (self.board[row,col-1][0] == 'w') and not self.whiteToMove #black captures diag up
-                    if wcaptup or bcaptup:
-                        moves.append(Move((r,c), (row,col-1), self.board))
-                row += 1 ; col -= 1 #update index
-            else: # cannot move to that square - thus also not capture
-                break
-        """ moving / capturing up right """
-        row = r-1 ; col = c+1
-        while row in range(10) and col in range(10):
-            if self.board[row,col] == "--":
-                moves.append(Move((r,c), (row, col), self.board))
-                # check where we can continue to look
-                if r-1 in range(10):
-                    # determine where white and black can capture
-                    wcaptup = (self.board[row-1,col][0] == 'b') and self.whiteToMove #capture on higher diag
-                    bcaptup = (self.board[row-1,col][0] == 'w') and not self.whiteToMove #black captures diag up
-                    if wcaptup or bcaptup: #captures on upper diagonal possible
-                        moves.append(Move((r,c), (row-1, col), self.board))
-                if col+1 in range(10):
-                    # determine where white and black can capture
-                    wcaptdown = (self.board[row,col+1][0] == 'b') and self.whiteToMove #capture on lower diag
-                    bcaptdown = (self.board[row,col+1][0] == 'w') and not self.whiteToMove #black captures diag down
-                    if wcaptdown or bcaptdown:
-                        moves.append(Move((r,c), (row,col+1), self.board))
-                row -= 1 ; col += 1 #update index
-            else: # cannot move to that square - thus also not capture
-                break
-        """ moving / capturing up left """
-        row = r-1 ; col = c-1
-        while row in range(10) and col in range(10):
-            if self.board[row,col] == "--":
-                moves.append(Move((r,c), (row, col), self.board))
-                # check where we can continue to look
-                if r-1 in range(10):
-                    # determine where white and black can capture
-                    wcaptup = (self.board[row-1,col][0] == 'b') and self.whiteToMove #capture on higher diag
-                    bcaptup = (self.board[row-1,col][0] == 'w') and not self.whiteToMove #black captures diag up
-                    if wcaptup or bcaptup: #captures on upper diagonal possible
-                        moves.append(Move((r,c), (row-1, col), self.board))
-                if col-1 in range(10):
-                    # determine where white and black can capture
-                    wcaptdown = (self.board[row,col-1][0] == 'b') and self.whiteToMove #capture on lower diag
-                    bcaptdown = (self.board[row,col-1][0] == 'w') and not self.whiteToMove #black captures diag down
-                    if wcaptdown or bcaptdown:
-                        moves.append(Move((r,c), (row,col-1), self.board))
-                row -= 1 ; col -= 1 #update index
-            else: # cannot move to that square - thus also not capture
-                break
-    
-
-    def hammerMoves(self, r, c, moves):
-        # the hammer moves like a rook and can capture on all rows and collums
-        # adjacent to its direction of travel
-        """ moving / capturing down """
-        row = r+1 ; col = c
-        while row in range(10) and col in range(10):
-            if self.board[row,col] == "--":
-                moves.append(Move((r,c), (row,col), self.board))
-                # check where we can continue to look:
-                if col-1 in range(10):
-                    wcaptleft = (self.board[row,col-1][0] == 'b') and self.whiteToMove #white captures left
-                    bcaptleft = (self.board[row,col-1][0] == 'w') and not self.whiteToMove #black captures left
-                    if wcaptleft or bcaptleft:
-                        moves.append(Move((r,c), (row,col-1), self.board))
-                if col+1 in range(10):
-                    wcaptright = (self.board[row,col+1][0] == 'b') and self.whiteToMove #white captures right
-                    bcaptright = (self.board[row,col+1][0] == 'w') and not self.whiteToMove #black captures right
-                    if wcaptright or bcaptright:
-                        moves.append(Move((r,c), (row,col+1), self.board))
-                row += 1
-            else: # cannot move further
-                break
-        """ moving / capturing up """
-        row = r-1 ; col = c
-        while row in range(10) and col in range(10):
-            if self.board[row,col] == "--":
-                moves.append(Move((r,c), (row,col), self.board))
-                # check where we can continue to look:
-                if col-1 in range(10):
-                    wcaptleft = (self.board[row,col-1][0] == 'b') and self.whiteToMove #white captures left
-                    bcaptleft = (self.board[row,col-1][0] == 'w') and not self.whiteToMove #black captures left
-                    if wcaptleft or bcaptleft:
-                        moves.append(Move((r,c), (row,col-1), self.board))
-                if col+1 in range(10):
-                    wcaptright = (self.board[row,col+1][0] == 'b') and self.whiteToMove #white captures right
-                    bcaptright = (self.board[row,col+1][0] == 'w') and not self.whiteToMove #black captures right
-                    if wcaptright or bcaptright:
-                        moves.append(Move((r,c), (row,col+1), self.board))
-                row -= 1
-            else: # cannot move further
-                break
-        """ moving / capturing to the right """
-        row = r ; col = c+1
-        while row in range(10) and col in range(10):
-            if self.board[row,col] == "--":
-                moves.append(Move((r,c), (row,col), self.board))
-                # check where we can continue to look
-                if row-1 in range(10):
-                    wcaptup = (self.board[row-1,col][0] == 'b') and self.whiteToMove #white captures up
-                    bcaptup = (self.board[row-1,col][0] == 'w') and not self.whiteToMove #black captures up
-                    if wcaptup or bcaptup:
-                        moves.append(Move((r,c), (row-1,col), self.board))
-                if row+1 in range(10):
-                    wcaptup = (self.board[row+1,col][0] == 'b') and self.whiteToMove #white captures up
-                    bcaptup = (self.board[row+1,col][0] == 'w') and not self.whiteToMove #black captures up
-                    if wcaptup or bcaptup:
-                        moves.append(Move((r,c), (row+1,col), self.board))
-                col += 1
-            else: # cannot move further
-                break
-        """ moving / capturing to the left """
-        row = r ; col = c-1
-        while row in range(10) and col in range(10):
-            if self.board[row,col] == "--":
-                moves.append(Move((r,c), (row,col), self.board))
-                # check where we can continue to look
-                if row-1 in range(10):
-                    wcaptup = (self.board[row-1,col][0] == 'b') and self.whiteToMove #white captures up
-                    bcaptup = (self.board[row-1,col][0] == 'w') and not self.whiteToMove #black captures up
-                    if wcaptup or bcaptup:
-                        moves.append(Move((r,c), (row-1,col), self.board))
-                if row+1 in range(10):
-                    wcaptup = (self.board[row+1,col][0] == 'b') and self.whiteToMove #white captures up
-                    bcaptup = (self.board[row+1,col][0] == 'w') and not self.whiteToMove #black captures up
-                    if wcaptup or bcaptup:
-                        moves.append(Move((r,c), (row+1,col), self.board))
-                col -= 1
-            else: # cannot move further
-                break
-                
-
 
 class castleRights():
 
@@ -729,13 +701,27 @@ class castleRights():
         self.wqs = wqs #white queenside
         self.bqs = bqs #balck queenside
 
+    """ rights as a 4 bit mask: wks, bks, wqs, bqs """
+    def mask(self):
+        return self.wks | self.bks << 1 | self.wqs << 2 | self.bqs << 3
+
+    def setMask(self, mask):
+        self.wks = bool(mask & 1)
+        self.bks = bool(mask & 2)
+        self.wqs = bool(mask & 4)
+        self.bqs = bool(mask & 8)
+
 
 
 
 class Move(): # handles squares to execute moves and keeps track of them
 
     # chess notation dictionary, see part 2 ca 25min
-
+    # files a-j from left to right, ranks 1-10 from white's side (row 9) up
+    ranksToRows = {str(rank): 10 - rank for rank in range(1, 11)}
+    rowsToRanks = {row: rank for rank, row in ranksToRows.items()}
+    filesToCols = {file: col for col, file in enumerate("abcdefghij")}
+    colsToFiles = {col: file for file, col in filesToCols.items()}
     def __init__(self, start_sq, end_sq, board, enPassant = False, isCastle=False):
         self.startRow = start_sq[0]
         self.startCol = start_sq[1]
@@ -754,6 +740,13 @@ class Move(): # handles squares to execute moves and keeps track of them
         #HASH function to create unique ID for each move
         self.moveID = self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol
  
+    """ coordinate notation of the move, e.g. 'e3e5' """
+    def getChessNotation(self):
+        return self.getRankFile(self.startRow, self.startCol) + self.getRankFile(self.endRow, self.endCol)
+
+    def getRankFile(self, r, c):
+        return self.colsToFiles[c] + self.rowsToRanks[r]
+
     # Overriding equals method to allow two move objects to be compared
     def __eq__(self, other):
         if isinstance(other, Move): #make sure it is also instance of Move class
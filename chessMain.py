@@ -3,6 +3,7 @@ Main driver file responsible for handling user input and displaying the current
 """
 
 import chessEngine
+import ponder
 import pygame as p
 
 
@@ -11,6 +12,8 @@ dimension = 10 #dimension of 10x10 chess
 sq_size = height // dimension 
 max_fps = 100 #for animations later
 images = {}
+playerOne = True # True if a human plays white, False if the computer does
+playerTwo = False # same for black
 
 # FUNCTIONS
 
@@ -45,6 +48,9 @@ def main():
     validMoves = gs.getValidMoves()
     moveMade = False
     animate = False #flag variable which moves are to be animated
+    ponderer = ponder.Ponderer() # engine analysis in a worker thread, keeps the render loop free
+    humanTurn = (gs.whiteToMove and playerOne) or (not gs.whiteToMove and playerTwo)
+    ponderer.start(gs, humanTurn)
 
     loadImages() #load images only once before while loop
 
@@ -57,11 +63,12 @@ def main():
         for e in p.event.get():
 
             if e.type == p.QUIT:
+                ponderer.stop()
                 running = False
         
             # mouse event handlers
             elif e.type == p.MOUSEBUTTONDOWN:
-                if not gameOver:
+                if not gameOver and humanTurn:
                     location = p.mouse.get_pos() #(x,y) coordinates of mouse
                     col = location[0] // sq_size # // double divide to get integers
                     row = location[1] // sq_size
@@ -88,13 +95,19 @@ def main():
             # key event handlers
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z: # 'z' Key to undo move
+                    ponderer.stop()
                     gs.undoMove()
+                    # against the computer take back its reply too, else it would just play it again
+                    computerToMove = not ((gs.whiteToMove and playerOne) or (not gs.whiteToMove and playerTwo))
+                    if (playerOne or playerTwo) and computerToMove and gs.moveLog:
+                        gs.undoMove()
                     selected_sq = () # reset selections
                     player_clicks = []
                     moveMade = True
                     animate = False
                     gameOver = False
                 if e.key == p.K_r: # resets the board with 'r' Key
+                    ponderer.stop()
                     gs = chessEngine.GameState()
                     validMoves = gs.getValidMoves()
                     selected_sq = ()
@@ -102,16 +115,33 @@ def main():
                     moveMade = False
                     animate = False
                     gameOver = False
+                    humanTurn = (gs.whiteToMove and playerOne) or (not gs.whiteToMove and playerTwo)
+                    ponderer.start(gs, humanTurn)
+
+        # computer move - the worker thread sets ponderer.reply once it is known
+        if not gameOver and not humanTurn and ponderer.reply is not None:
+            for move in validMoves:
+                if move.moveID == ponderer.reply:
+                    gs.makeMove(move)
+                    moveMade = True
+                    animate = True
+                    break
+            ponderer.reply = None
 
         if moveMade: #only generate new valid move list if a valid move was actually made
+            ponderer.stop() # the position changed under the worker
             if animate:
                 animateMove(gs.moveLog[-1], screen, gs.board, clock) #animate move
             validMoves = gs.getValidMoves()
             moveMade = False
             animate = False
+            humanTurn = (gs.whiteToMove and playerOne) or (not gs.whiteToMove and playerTwo)
+            if validMoves:
+                ponderer.start(gs, humanTurn)
 
         # draw game
         drawGameState(screen, gs, validMoves, selected_sq)
+        drawAnalysis(screen, ponderer)
         if gs.isCheckMate:
             gameOver = True
             if not gs.whiteToMove:
@@ -178,6 +208,19 @@ def drawPieces(screen, board):
             if piece != "--": # not empty square
                 screen.blit(images[piece], p.Rect(c*sq_size, r*sq_size, sq_size, sq_size))
 
+# live evaluation and best line of the background analysis
+def drawAnalysis(screen, ponderer):
+    if ponderer.evaluation is None:
+        return
+    font = p.font.SysFont("Helvetica", 18, True, False)
+    text = "Eval %+.2f (depth %d)  %s" % (ponderer.evaluation / 100, ponderer.evaluationDepth, " ".join(ponderer.bestLine))
+    textObject = font.render(text, 0, p.Color('Black'))
+    background = p.Surface((textObject.get_width() + 10, textObject.get_height() + 6))
+    background.set_alpha(180)
+    background.fill(p.Color('white'))
+    screen.blit(background, (0, 0))
+    screen.blit(textObject, (5, 3))
+
 def drawText(screen, text):
     font = p.font.SysFont("Helvetica", 32, True, False)
     textObject = font.render(text, 0, p.Color('Blue'))
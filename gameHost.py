@@ -0,0 +1,109 @@
+"""
+Game host that keeps many concurrent games in one process.
+Every game is stored as a fixed-size position record (see chessEngine.positionSize) plus a
+packed move history. A game is only loaded into the single working GameState when a move arrives.
+"""
+
+import random
+import sys
+import time
+from array import array
+
+import chessEngine
+
+
+class GameHost():
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.records = bytearray(capacity * chessEngine.positionSize) # all position records back to back
+        self.histories = [None] * capacity # packed move history per slot, None if slot is free
+        self.freeSlots = list(range(capacity - 1, -1, -1))
+        self.activeGames = 0
+        self.workState = chessEngine.GameState() # the only full GameState, reused for every game
+        self.startRecord = self.workState.packPosition()
+
+    """ double the number of slots when all are in use """
+    def grow(self):
+        self.records.extend(bytes(self.capacity * chessEngine.positionSize))
+        self.histories.extend([None] * self.capacity)
+        self.freeSlots.extend(range(2*self.capacity - 1, self.capacity - 1, -1))
+        self.capacity *= 2
+
+    """ start a new game from the initial position and return its id """
+    def newGame(self):
+        if not self.freeSlots:
+            self.grow()
+        gameId = self.freeSlots.pop()
+        offset = gameId * chessEngine.positionSize
+        self.records[offset:offset + chessEngine.positionSize] = self.startRecord
+        self.histories[gameId] = array('H')
+        self.activeGames += 1
+        return gameId
+
+    """ release the slot of a finished game """
+    def endGame(self, gameId):
+        if self.histories[gameId] is not None:
+            self.histories[gameId] = None
+            self.freeSlots.append(gameId)
+            self.activeGames -= 1
+
+    """ raise KeyError unless gameId is a running game - freed slots must not be read or written """
+    def checkGame(self, gameId):
+        if not 0 <= gameId < self.capacity or self.histories[gameId] is None:
+            raise KeyError("no active game %r" % gameId)
+
+    """ load a game into the working GameState and return it - only valid until the next host call """
+    def loadGame(self, gameId):
+        self.checkGame(gameId)
+        offset = gameId * chessEngine.positionSize
+        self.workState.setPosition(memoryview(self.records)[offset:offset + chessEngine.positionSize])
+        return self.workState
+
+    """ play start_sq -> end_sq in a game, returns False if the move is not valid """
+    def playMove(self, gameId, start_sq, end_sq):
+        gs = self.loadGame(gameId)
+        move = chessEngine.Move(start_sq, end_sq, gs.board)
+        for validMove in gs.getValidMoves():
+            if move == validMove:
+                gs.makeMove(validMove)
+                offset = gameId * chessEngine.positionSize
+                self.records[offset:offset + chessEngine.positionSize] = gs.packPosition()
+                self.histories[gameId].append(validMove.moveID) # moveID fits into 16 bits
+                return True
+        return False
+
+    """ list of (start_sq, end_sq) tuples of all moves played in a game """
+    def moveHistory(self, gameId):
+        self.checkGame(gameId)
+        return [(divmod(moveID // 100, 10), divmod(moveID % 100, 10)) for moveID in self.histories[gameId]]
+
+    """ average memory footprint of an active game in bytes, including its share of the slot tables """
+    def bytesPerGame(self):
+        if self.activeGames == 0:
+            return 0
+        total = sys.getsizeof(self.records) + sys.getsizeof(self.histories) + sys.getsizeof(self.freeSlots)
+        total += sum(sys.getsizeof(history) for history in self.histories if history is not None)
+        return total / self.activeGames
+
+
+""" host a number of games playing random moves and report memory and throughput """
+def main():
+    numGames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    numMoves = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    host = GameHost()
+    games = [host.newGame() for i in range(numGames)]
+    start = time.time()
+    for i in range(numMoves):
+        gameId = random.choice(games)
+        moves = host.loadGame(gameId).getValidMoves()
+        if moves:
+            move = random.choice(moves)
+            host.playMove(gameId, (move.startRow, move.startCol), (move.endRow, move.endCol))
+    elapsed = time.time() - start
+    print(f"{host.activeGames} games, {host.bytesPerGame():.1f} bytes per game")
+    print(f"{numMoves} moves in {elapsed:.2f}s ({numMoves/elapsed:.1f} moves/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Opt-in instrumentation of the rules hot paths. enable() swaps the GameState methods below (and every
+generator in moveFunctions) for counting and timing wrappers, disable() puts the originals back, so
+there is no overhead at all while it is off. Calls to the shared pieceMoves generator are recorded per
+piece kind, e.g. pieceMoves[h] for hammers. Move allocations are counted per call stack.
+
+    instrumentation.enable(gs)      # states created earlier must be passed to rebind their moveFunctions
+    ... play or search ...
+    instrumentation.disable(gs)
+    print(instrumentation.report())
+    instrumentation.writeCollapsed("stacks.txt")   # flamegraph.pl / speedscope input, microseconds
+
+Run directly to profile random games: python instrumentation.py --games 2 --plies 60
+"""
+
+import argparse
+import functools
+import random
+import time
+from collections import defaultdict
+
+import chessEngine
+
+instrumentedMethods = ["getValidMoves", "getPossibleMoves", "squareAttacked", "inCheck", "attackersTo",
+                       "getCastleMoves", "makeMove", "undoMove"]
+
+originals = {} # method name -> original function while enabled
+stack = [] # names of the instrumented calls in progress
+childTimes = [] # time spent in instrumented callees, one entry per call in progress
+calls = defaultdict(int)
+totalTimes = defaultdict(float) # including instrumented callees
+selfTimes = defaultdict(float)
+stackTimes = defaultdict(float) # self time by ';' joined call stack
+moveAllocations = defaultdict(int) # by ';' joined call stack
+
+
+""" move generators, taken from the moveFunctions of a fresh GameState """
+def generatorNames():
+    return sorted({function.__name__ for function in chessEngine.GameState().moveFunctions.values()})
+
+
+def wrap(name, function, byPiece=False):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        frame = "%s[%s]" % (name, args[0].board[args[1], args[2]][1]) if byPiece else name
+        stack.append(frame)
+        childTimes.append(0.0)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - childTimes.pop()
+            stackTimes[";".join(stack)] += own
+            stack.pop()
+            if childTimes:
+                childTimes[-1] += elapsed
+            calls[frame] += 1
+            totalTimes[frame] += elapsed
+            selfTimes[frame] += own
+    return wrapper
+
+
+def countingMoveInit(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        moveAllocations[";".join(stack) or "<top>"] += 1
+        return function(*args, **kwargs)
+    return wrapper
+
+
+""" point the moveFunctions of existing states at the current class methods """
+def rebind(states):
+    for gs in states:
+        for kind, function in gs.moveFunctions.items():
+            gs.moveFunctions[kind] = getattr(gs, function.__name__)
+
+
+""" start instrumenting - states created before this call must be passed in """
+def enable(*states):
+    if originals:
+        return
+    for name in instrumentedMethods + generatorNames():
+        originals[name] = getattr(chessEngine.GameState, name)
+        setattr(chessEngine.GameState, name, wrap(name, originals[name], name == "pieceMoves"))
+    originals["Move.__init__"] = chessEngine.Move.__init__
+    chessEngine.Move.__init__ = countingMoveInit(chessEngine.Move.__init__)
+    rebind(states)
+
+
+""" restore the original methods - pass the same states as to enable """
+def disable(*states):
+    if not originals:
+        return
+    chessEngine.Move.__init__ = originals.pop("Move.__init__")
+    for name, function in originals.items():
+        setattr(chessEngine.GameState, name, function)
+    originals.clear()
+    rebind(states)
+
+
+def reset():
+    for table in (calls, totalTimes, selfTimes, stackTimes, moveAllocations):
+        table.clear()
+
+
+""" text table of calls, total and self time per method, and Move allocations per generator """
+def report():
+    lines = ["%-18s %10s %12s %12s %10s" % ("method", "calls", "total ms", "self ms", "us/call")]
+    for name in sorted(calls, key=lambda name: -selfTimes[name]):
+        lines.append("%-18s %10d %12.1f %12.1f %10.2f" % (name, calls[name], 1e3 * totalTimes[name],
+                                                         1e3 * selfTimes[name], 1e6 * totalTimes[name] / calls[name]))
+    allocations = defaultdict(int)
+    for path, count in moveAllocations.items():
+        allocations[path.rsplit(";", 1)[-1]] += count
+    lines.append("")
+    lines.append("Move allocations: %d" % sum(allocations.values()))
+    for name, count in sorted(allocations.items(), key=lambda item: -item[1]):
+        perCall = " (%.1f per call)" % (count / calls[name]) if calls.get(name) else ""
+        lines.append("  %-16s %10d%s" % (name, count, perCall))
+    return "\n".join(lines)
+
+
+""" self time per call stack in the collapsed format of flamegraph.pl ('a;b;c microseconds') """
+def writeCollapsed(path):
+    with open(path, "w") as f:
+        for stackPath, seconds in sorted(stackTimes.items()):
+            f.write("%s %d\n" % (stackPath, round(1e6 * seconds)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="profile move generation in random games")
+    parser.add_argument("--games", type=int, default=2)
+    parser.add_argument("--plies", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--collapsed", default="stacks.txt", help="collapsed stack output for flame graphs")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    enable()
+    for game in range(args.games):
+        gs = chessEngine.GameState()
+        for ply in range(args.plies):
+            moves = gs.getValidMoves()
+            if not moves:
+                break
+            gs.makeMove(rng.choice(moves))
+    disable()
+    print(report())
+    writeCollapsed(args.collapsed)
+    print("\ncollapsed stacks written to %s" % args.collapsed)
+
+
+if __name__ == "__main__":
+    main()
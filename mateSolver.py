@@ -0,0 +1,173 @@
+"""
+Mate solver for composed problems: depth-first proof-number search (df-pn) on top of GameState.
+The attacking side (the side to move at the root) only plays checking moves unless allMoves is set,
+the defender plays every legal move. Proof and disproof numbers are kept in a bounded table keyed by
+zobrist key and attacker moves left, so memory stays fixed however long a problem takes.
+
+Puzzle files have one problem per line: a position in GameState.getFen notation followed by N, e.g.
+    k9/10/1K8/10/10/10/10/10/10/9Q w - - 1
+
+    python mateSolver.py puzzles.txt --workers 4
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import chessEngine
+
+infinity = 10 ** 9
+
+
+class ProofTable():
+    """ (phi, delta) by (zobrist key, attacker moves left), bounded to maxEntries """
+
+    def __init__(self, maxEntries=1 << 20):
+        self.maxEntries = maxEntries
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key, (1, 1))
+
+    def store(self, key, phi, delta):
+        if len(self.entries) >= self.maxEntries:
+            # keep solved entries, they are the expensive ones, unless they fill the table by themselves
+            self.entries = {k: v for k, v in self.entries.items() if v[0] == 0 or v[1] == 0}
+            if len(self.entries) >= self.maxEntries * 3 // 4:
+                self.entries.clear()
+        self.entries[key] = (phi, delta)
+
+
+class MateSolver():
+
+    def __init__(self, maxEntries=1 << 20, allMoves=False):
+        self.table = ProofTable(maxEntries)
+        self.allMoves = allMoves
+        self.nodes = 0
+
+    """ legal moves of the attacker that give check """
+    def checkingMoves(self, gs):
+        checks = []
+        for move in gs.getValidMoves():
+            gs.makeMove(move)
+            if gs.inCheck(): # the defender is to move now
+                checks.append(move)
+            gs.undoMove()
+        return checks
+
+    """
+    prove or refute mate in n for the side to move.
+    Returns (True, first move) if there is a mate, (False, None) if not
+    """
+    def solve(self, gs, n):
+        self.nodes = 0
+        self.attackerIsWhite = gs.whiteToMove
+        checkMate, staleMate = gs.isCheckMate, gs.isStaleMate
+        self.mid(gs, n, infinity, infinity)
+        gs.isCheckMate, gs.isStaleMate = checkMate, staleMate
+        phi, delta = self.table.get((gs.zobristKey, n))
+        if phi != 0:
+            return False, None
+        for move in self.children(gs, n)[0]:
+            gs.makeMove(move)
+            childDelta = self.table.get((gs.zobristKey, n - 1))[1]
+            gs.undoMove()
+            if childDelta == 0:
+                return True, move
+        return True, None
+
+    """ (moves, attacker moves left after them) for the node, terminal nodes have no moves """
+    def children(self, gs, movesLeft):
+        if gs.whiteToMove == self.attackerIsWhite:
+            if movesLeft == 0:
+                return [], 0
+            return (gs.getValidMoves() if self.allMoves else self.checkingMoves(gs)), movesLeft - 1
+        return gs.getValidMoves(), movesLeft
+
+    """
+    multiple iterative deepening: search the node until its phi or delta reaches the threshold.
+    phi is the proof number for the side to move reaching its goal (mate for the attacker,
+    escaping for the defender), delta the disproof number
+    """
+    def mid(self, gs, movesLeft, thresholdPhi, thresholdDelta):
+        self.nodes += 1
+        key = (gs.zobristKey, movesLeft)
+        moves, childMovesLeft = self.children(gs, movesLeft)
+        attacker = gs.whiteToMove == self.attackerIsWhite
+        if not moves:
+            if attacker or gs.isCheckMate: # attacker out of checks or moves, or defender mated
+                self.table.store(key, infinity, 0)
+            else: # defender stalemated
+                self.table.store(key, 0, infinity)
+            return
+        if not attacker and movesLeft == 0: # the defender has a move and the attacker none left
+            self.table.store(key, 0, infinity)
+            return
+        childKeys = []
+        for move in moves:
+            gs.makeMove(move)
+            childKeys.append((gs.zobristKey, childMovesLeft))
+            gs.undoMove()
+        while True:
+            values = [self.table.get(childKey) for childKey in childKeys]
+            phi = min(delta for childPhi, delta in values)
+            delta = min(infinity, sum(childPhi for childPhi, childDelta in values))
+            if phi >= thresholdPhi or delta >= thresholdDelta:
+                self.table.store(key, phi, delta)
+                return
+            # child with the smallest delta, and the second smallest delta for its threshold
+            best = min(range(len(moves)), key=lambda i: values[i][1])
+            secondDelta = min([values[i][1] for i in range(len(moves)) if i != best], default=infinity)
+            bestPhi, bestDelta = values[best]
+            childThresholdPhi = min(infinity, thresholdDelta + bestPhi - delta)
+            childThresholdDelta = min(thresholdPhi, secondDelta + 1)
+            gs.makeMove(moves[best])
+            self.mid(gs, childMovesLeft, childThresholdPhi, childThresholdDelta)
+            gs.undoMove()
+
+
+""" solve one puzzle line, returns a result line - runs in the worker processes """
+def solvePuzzle(task):
+    lineNumber, line, maxEntries, allMoves = task
+    fen, _, n = line.rpartition(" ")
+    gs = chessEngine.GameState()
+    try:
+        gs.setFen(fen)
+        n = int(n)
+    except ValueError as e:
+        return "%d: error %s" % (lineNumber, e)
+    solver = MateSolver(maxEntries, allMoves)
+    start = time.perf_counter()
+    try:
+        mate, move = solver.solve(gs, n)
+    except Exception as e: # one bad puzzle must not stop the batch
+        return "%d: error %s: %s" % (lineNumber, type(e).__name__, e)
+    elapsed = time.perf_counter() - start
+    if mate:
+        result = "mate in %d: %s" % (n, move.getChessNotation() if move else "?")
+    else: # without allMoves only mates made of checks were searched
+        result = ("no mate in %d" if allMoves else "no mate by checks in %d") % n
+    return "%d: %s (%d nodes, %.2fs)" % (lineNumber, result, solver.nodes, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="prove or refute mate-in-N problems")
+    parser.add_argument("puzzles", help="puzzle file, - for stdin")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-entries", type=int, default=1 << 20, help="proof table size per puzzle")
+    parser.add_argument("--all-moves", action="store_true", help="let the attacker play quiet moves too")
+    args = parser.parse_args()
+    source = sys.stdin if args.puzzles == "-" else open(args.puzzles)
+    tasks = [(i, line.strip(), args.max_entries, args.all_moves) for i, line in enumerate(source)
+             if line.strip() and not line.startswith("#")]
+    start = time.perf_counter()
+    with mp.Pool(args.workers) as pool:
+        for result in pool.imap(solvePuzzle, tasks):
+            print(result, flush=True)
+    print("%d puzzles in %.1fs" % (len(tasks), time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Memory and allocation regression checks, measured with tracemalloc:
+    gameStateBytes      bytes kept alive per GameState
+    moveBytes           bytes kept alive per Move
+    validMovesBlocks    memory blocks kept alive by one getValidMoves call (the list and its moves)
+    validMovesPeakBytes peak memory allocated during one getValidMoves call
+
+Results are compared to memoryBaseline.json and the run exits with status 1 if any of them grew by more
+than --threshold. After an intended change, store the new numbers with --update-baseline.
+
+    python memoryBenchmarks.py
+    python memoryBenchmarks.py --update-baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tracemalloc
+
+import numpy as np
+
+import benchmarks
+import chessEngine
+
+baselinePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memoryBaseline.json")
+ignoreTracemalloc = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+""" (bytes, blocks) kept alive per object by build(i), averaged over count objects """
+def retained(build, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces(ignoreTracemalloc)
+    kept = [build(i) for i in range(count)]
+    after = tracemalloc.take_snapshot().filter_traces(ignoreTracemalloc)
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in stats) - sys.getsizeof(kept)
+    blocks = sum(stat.count_diff for stat in stats) - 1
+    del kept
+    return size / count, blocks / count
+
+
+def measureGameState(count):
+    return retained(lambda i: chessEngine.GameState(), count)[0]
+
+
+def measureMove(positions):
+    moves = [(gs, move) for gs in positions for move in gs.getPossibleMoves()]
+    return retained(lambda i: chessEngine.Move((moves[i][1].startRow, moves[i][1].startCol),
+                                               (moves[i][1].endRow, moves[i][1].endCol), moves[i][0].board),
+                    len(moves))[0]
+
+
+""" (blocks kept per call, peak bytes per call) of getValidMoves """
+def measureValidMoves(positions):
+    blocks = retained(lambda i: positions[i].getValidMoves(), len(positions))[1]
+    peak = 0
+    tracemalloc.start()
+    for gs in positions:
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        validMoves = gs.getValidMoves()
+        peak += tracemalloc.get_traced_memory()[1] - current
+        del validMoves
+    tracemalloc.stop()
+    return blocks, peak / len(positions)
+
+
+def runBenchmarks(args):
+    positions = benchmarks.randomPositions(args.positions, args.seed)
+    for gs in positions: # warm up caches and lazily created attributes before measuring
+        gs.getValidMoves()
+    validMovesBlocks, validMovesPeakBytes = measureValidMoves(positions)
+    return {"gameStateBytes": round(measureGameState(args.states)),
+            "moveBytes": round(measureMove(positions)),
+            "validMovesBlocks": round(validMovesBlocks, 1),
+            "validMovesPeakBytes": round(validMovesPeakBytes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="memory and allocation regression benchmarks")
+    parser.add_argument("--positions", type=int, default=50, help="random positions for the move measurements")
+    parser.add_argument("--states", type=int, default=200, help="GameStates to create")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed growth over the baseline, 0.10 = 10%%")
+    parser.add_argument("--baseline", default=baselinePath)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = runBenchmarks(args)
+    environment = {"python": platform.python_version(), "numpy": np.__version__}
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": environment, "results": results}, f, indent=2)
+            f.write("\n")
+        print("baseline written to %s" % args.baseline)
+        for name, value in results.items():
+            print("%-20s %12s" % (name, value))
+        return
+
+    if not os.path.exists(args.baseline):
+        sys.exit("no baseline at %s, create one with --update-baseline" % args.baseline)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["environment"] != environment:
+        # allocation sizes depend on the interpreter and numpy builds
+        print("warning: baseline from %s, running %s" % (baseline["environment"], environment))
+    regressions = 0
+    print("%-20s %12s %12s %8s" % ("measurement", "baseline", "current", "change"))
+    for name, value in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print("%-20s %12s %12s %8s" % (name, "-", value, "new"))
+            continue
+        change = (value - old) / old if old else 0.0
+        regressed = change > args.threshold
+        regressions += regressed
+        print("%-20s %12s %12s %+7.1f%%%s" % (name, old, value, 100 * change, "  REGRESSION" if regressed else ""))
+    if regressions:
+        sys.exit("%d measurement(s) grew by more than %.0f%%" % (regressions, 100 * args.threshold))
+
+
+if __name__ == "__main__":
+    main()
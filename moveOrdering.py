@@ -0,0 +1,71 @@
+"""
+Move ordering heuristics for alpha-beta search over GameState: MVV-LVA scores for captures,
+two killer moves per ply and a butterfly history table indexed by start and end square.
+All tables are NumPy arrays, so they can be reset and decayed between searches without reallocating.
+"""
+
+import numpy as np
+
+import chessEngine
+
+pieceKinds = "prnubqkecham" # row/column order of the MVV-LVA table
+kindIndex = {kind: i for i, kind in enumerate(pieceKinds)}
+
+# ordering bands - a hash move beats captures, captures beat killers, killers beat the history score
+hashMoveScore = 1 << 30
+captureScore = 1 << 28
+killerScore = 1 << 26
+historyLimit = 1 << 24 # history scores are halved once one of them reaches this
+
+
+class MoveOrderer():
+
+    def __init__(self, maxPly=64):
+        self.maxPly = maxPly
+        self.killers = np.full((maxPly, 2), -1, dtype=np.int32) # moveIDs of quiet moves that caused cutoffs
+        self.history = np.zeros((100, 100), dtype=np.int32) # cutoff scores of quiet moves, start x end square
+        # most valuable victim first, least valuable attacker breaks ties
+        values = [chessEngine.seeValues[kind] for kind in pieceKinds]
+        self.mvvLva = np.array([[16 * victim - attacker // 100 for attacker in values] for victim in values],
+                               dtype=np.int32)
+
+    """ ordering score of a single move at ply """
+    def scoreMove(self, move, ply, hashMoveID=-1):
+        if move.moveID == hashMoveID:
+            return hashMoveScore
+        if move.captured_piece != "--":
+            return captureScore + int(self.mvvLva[kindIndex[move.captured_piece[1]], kindIndex[move.moved_piece[1]]])
+        if ply < self.maxPly:
+            if move.moveID == self.killers[ply, 0]:
+                return killerScore + 1
+            if move.moveID == self.killers[ply, 1]:
+                return killerScore
+        return int(self.history[move.startRow*10 + move.startCol, move.endRow*10 + move.endCol])
+
+    """ sort moves in place, most promising first """
+    def orderMoves(self, moves, ply, hashMove=None):
+        hashMoveID = hashMove.moveID if hashMove is not None else -1
+        moves.sort(key=lambda move: self.scoreMove(move, ply, hashMoveID), reverse=True)
+
+    """ remember a move that caused a beta cutoff at ply with depth plies left to search """
+    def recordCutoff(self, move, ply, depth):
+        if move.captured_piece != "--":
+            return # captures are ordered by MVV-LVA already
+        if ply < self.maxPly and self.killers[ply, 0] != move.moveID:
+            self.killers[ply, 1] = self.killers[ply, 0]
+            self.killers[ply, 0] = move.moveID
+        start = move.startRow*10 + move.startCol
+        end = move.endRow*10 + move.endCol
+        self.history[start, end] += depth * depth
+        if self.history[start, end] >= historyLimit:
+            self.history >>= 1
+
+    """ age the tables between searches: halve the history and forget the killers """
+    def decay(self):
+        self.history >>= 1
+        self.killers.fill(-1)
+
+    """ forget everything, e.g. for a new game """
+    def clear(self):
+        self.history.fill(0)
+        self.killers.fill(-1)
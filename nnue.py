@@ -0,0 +1,155 @@
+"""
+Small NNUE-style evaluation in NumPy. The input is the 24 x 100 piece-square feature set (feature
+(code-1)*100 + square for every piece, codes from chessEngine.pieceCodes). The first layer is kept in an
+accumulator that GameState.makeMove and undoMove update incrementally by adding and subtracting
+weight rows, so evaluating a position only costs the small output layer.
+
+    net = nnue.Network.load("weights.npz")
+    nnue.attach(gs, net)         # chessAI.scoreBoard now uses the network for gs
+    python nnue.py train data/ weights.npz --hidden 64 --epochs 4   # fit to selfPlay.py data
+"""
+
+import argparse
+
+import numpy as np
+
+import chessEngine
+
+numFeatures = 24 * 100
+
+
+class Network():
+    """ weights1 (2400 x hidden), bias1, weights2 (hidden), bias2 - output is the evaluation in pawns for white """
+
+    def __init__(self, weights1, bias1, weights2, bias2):
+        self.weights1 = np.ascontiguousarray(weights1, dtype=np.float32)
+        self.bias1 = np.asarray(bias1, dtype=np.float32)
+        self.weights2 = np.asarray(weights2, dtype=np.float32)
+        self.bias2 = float(bias2)
+        self.hidden = len(self.bias1)
+
+    @classmethod
+    def random(cls, hidden=64, seed=0):
+        rng = np.random.default_rng(seed)
+        return cls(rng.normal(0, 0.1, (numFeatures, hidden)), np.zeros(hidden),
+                   rng.normal(0, 1 / np.sqrt(hidden), hidden), 0.0)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["weights1"], data["bias1"], data["weights2"], data["bias2"])
+
+    def save(self, path):
+        np.savez(path, weights1=self.weights1, bias1=self.bias1, weights2=self.weights2, bias2=self.bias2)
+
+    """ first layer of a position from scratch, for checking the accumulator and for benchmarks """
+    def firstLayer(self, gs):
+        codes = gs.boardCodes()
+        squares = np.flatnonzero(codes)
+        return self.bias1 + self.weights1[(codes[squares].astype(np.intp) - 1) * 100 + squares].sum(axis=0)
+
+    """ evaluation in centipawns for white from a first layer """
+    def output(self, layer):
+        return int(100 * (np.clip(layer, 0, 1) @ self.weights2 + self.bias2))
+
+
+class Accumulator():
+    """ stack of first layer values, one row per ply, preallocated like the GameState undo stack """
+
+    def __init__(self, network, gs):
+        self.network = network
+        self.stack = np.zeros((chessEngine.maxPly, network.hidden), dtype=np.float32)
+        self.clipped = np.zeros(network.hidden, dtype=np.float32)
+        self.refresh(gs)
+
+    def refresh(self, gs):
+        self.top = 0
+        self.stack[0] = self.network.firstLayer(gs)
+
+    """ push the first layer after move, called by GameState.makeMove once the board is updated """
+    def makeMove(self, move):
+        if self.top + 1 == len(self.stack):
+            self.stack = np.concatenate([self.stack, np.zeros_like(self.stack)])
+        weights = self.network.weights1
+        colour = move.moved_piece[0]
+        moved = chessEngine.pieceIndex[move.moved_piece] - 1
+        placed = chessEngine.pieceIndex[colour + 'q'] - 1 if move.isPawnPromotion else moved
+        start = move.startRow*10 + move.startCol
+        end = move.endRow*10 + move.endCol
+        layer = self.stack[self.top + 1]
+        np.subtract(self.stack[self.top], weights[moved*100 + start], out=layer)
+        layer += weights[placed*100 + end]
+        if move.captured_piece != "--":
+            square = move.startRow*10 + move.endCol if move.isEnPassant else end
+            layer -= weights[(chessEngine.pieceIndex[move.captured_piece] - 1)*100 + square]
+        if move.isCastling:
+            rook = (chessEngine.pieceIndex[colour + 'r'] - 1) * 100
+            fromSquare, toSquare = (end + 1, end - 1) if move.endCol - move.startCol == 3 else (end - 1, end + 1)
+            layer -= weights[rook + fromSquare]
+            layer += weights[rook + toSquare]
+        self.top += 1
+
+    def undoMove(self):
+        self.top -= 1
+
+    """ evaluation in centipawns for white """
+    def evaluate(self):
+        np.clip(self.stack[self.top], 0, 1, out=self.clipped)
+        return int(100 * (self.clipped @ self.network.weights2 + self.network.bias2))
+
+
+""" evaluate gs with network from now on, until detach """
+def attach(gs, network):
+    gs.accumulator = Accumulator(network, gs)
+
+
+def detach(gs):
+    gs.accumulator = None
+
+
+""" fit a network to a selfPlay.py dataset: search scores, turned to white's view, in pawns """
+def train(directory, hidden=64, epochs=4, batchSize=256, learningRate=0.01, seed=0):
+    import selfPlay
+    network = Network.random(hidden, seed)
+    rng = np.random.default_rng(seed)
+    shards = selfPlay.loadDataset(directory)
+    for epoch in range(epochs):
+        totalLoss = count = 0
+        for planes, labels, keys in shards:
+            for batch in np.array_split(rng.permutation(len(planes)), max(1, len(planes) // batchSize)):
+                batch = np.sort(batch) # sorted rows read the memory maps sequentially
+                x = planes[batch, :24].reshape(len(batch), numFeatures).astype(np.float32)
+                whiteToMove = planes[batch, 24, 0, 0] == 1
+                target = np.clip(labels[batch, 1] / 100, -20, 20) * np.where(whiteToMove, 1, -1)
+                layer = x @ network.weights1 + network.bias1
+                active = (layer > 0) & (layer < 1)
+                clipped = np.clip(layer, 0, 1)
+                error = clipped @ network.weights2 + network.bias2 - target
+                totalLoss += float(error @ error)
+                count += len(batch)
+                gradient = error / len(batch)
+                gradientLayer = np.outer(gradient, network.weights2) * active
+                network.weights2 -= learningRate * (clipped.T @ gradient)
+                network.bias2 -= learningRate * float(gradient.sum())
+                network.weights1 -= learningRate * (x.T @ gradientLayer)
+                network.bias1 -= learningRate * gradientLayer.sum(axis=0)
+        print(f"epoch {epoch + 1}: mean squared error {totalLoss / max(1, count):.3f} pawns^2")
+    return network
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NNUE evaluation tools")
+    parser.add_argument("command", choices=["train", "random"])
+    parser.add_argument("paths", nargs="+", help="train: dataset directory and output file, random: output file")
+    parser.add_argument("--hidden", type=int, default=64)
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--learning-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    if args.command == "train":
+        train(args.paths[0], args.hidden, args.epochs, learningRate=args.learning_rate).save(args.paths[1])
+    else:
+        Network.random(args.hidden).save(args.paths[0])
+
+
+if __name__ == "__main__":
+    main()
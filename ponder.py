@@ -0,0 +1,92 @@
+"""
+Background analysis for the GUI. While the human is thinking, a worker thread analyses the position
+for the live evaluation overlay and then searches the computer's reply to the human's likely moves,
+so that a predicted move is answered straight from the reply cache.
+"""
+
+import threading
+
+import chessAI
+import chessEngine
+import moveOrdering
+
+
+class Ponderer():
+
+    def __init__(self, depth=3, maxReplies=1 << 16):
+        self.depth = depth # search depth for the evaluation and for the computer's replies
+        self.maxReplies = maxReplies
+        self.table = chessAI.TranspositionTable() # shared by every search, so pondering prefills it
+        self.search = chessAI.Search(moveOrdering.MoveOrderer(), self.table)
+        self.replies = {} # zobrist key of a position with the computer to move -> moveID of its reply
+        self.thread = None
+        # live results, read by the render loop
+        self.evaluation = None # centipawns from white's point of view
+        self.evaluationDepth = 0
+        self.bestLine = [] # moves in coordinate notation
+        self.reply = None # moveID of the computer's move once it is known
+        self.thinking = False
+
+    """ private copy of the position so the worker never touches the GUI's GameState """
+    def copyState(self, gs):
+        copy = chessEngine.GameState()
+        copy.setPosition(gs.packPosition())
+        return copy
+
+    """ start background work for a new position: pondering on the human's turn, the reply otherwise """
+    def start(self, gs, humanTurn):
+        self.stop()
+        self.reply = None
+        if not humanTurn and gs.zobristKey in self.replies:
+            self.reply = self.replies[gs.zobristKey] # predicted - answer immediately
+            return
+        target = self.ponder if humanTurn else self.findReply
+        self.thread = threading.Thread(target=target, args=(self.copyState(gs),), daemon=True)
+        self.thinking = True
+        self.thread.start()
+
+    """ abort the running search and wait for the worker to finish """
+    def stop(self):
+        if self.thread is not None:
+            self.search.stopped = True
+            self.thread.join()
+            self.search.stopped = False
+            self.thread = None
+        self.thinking = False
+
+    def updateOverlay(self, gs, depth, move, score, line):
+        self.evaluation = score if gs.whiteToMove else -score
+        self.evaluationDepth = depth
+        self.bestLine = [lineMove.getChessNotation() for lineMove in line]
+
+    """ computer's turn: search the reply unless the position was predicted while pondering """
+    def findReply(self, gs):
+        self.search.orderer.decay()
+        move, score = self.search.think(gs, self.depth,
+                                        lambda depth, move, score, line: self.updateOverlay(gs, depth, move, score, line))
+        if move is not None and not self.search.stopped:
+            self.reply = move.moveID
+        self.thinking = False
+
+    """ human's turn: analyse the position, then prefill replies to the human's moves, most likely first """
+    def ponder(self, gs):
+        self.search.orderer.decay()
+        move, score = self.search.think(gs, self.depth,
+                                        lambda depth, move, score, line: self.updateOverlay(gs, depth, move, score, line))
+        if self.search.stopped:
+            return
+        predictions = gs.getValidMoves()
+        self.search.orderer.orderMoves(predictions, 0, move) # the best move first, then by the ordering heuristics
+        if len(self.replies) >= self.maxReplies:
+            self.replies.clear()
+        for prediction in predictions:
+            gs.makeMove(prediction)
+            if gs.zobristKey not in self.replies:
+                reply, replyScore = self.search.think(gs, self.depth)
+                if self.search.stopped:
+                    gs.undoMove()
+                    return
+                if reply is not None:
+                    self.replies[gs.zobristKey] = reply.moveID
+            gs.undoMove()
+        self.thinking = False
@@ -0,0 +1,232 @@
+"""
+Self-play training data pipeline. Player processes play games with the search from chessAI and encode
+every position as 29 binary 10x10 planes: one per piece code (chessEngine.pieceCodes[1:]), side to move
+and the four castling rights. Writer processes store the planes with their labels in sharded,
+memory-mapped .npy files, so datasets can grow far beyond RAM.
+
+Positions are routed to writers by zobrist key, so each writer owns a slice of the key space and
+deduplicates it exactly with a compact open addressing hash set. Running again on the same directory
+adds to the dataset - keep --writers unchanged so every key stays with the writer that has seen it.
+
+    python selfPlay.py data/ --games 1000 --players 6 --writers 2 --nodes 300
+
+Every shard is a triple <writer>-<shard>-planes.npy (uint8, N x 29 x 10 x 10), -labels.npy
+(int32, N x 3: game result for white, search score for the side to move, ply) and -keys.npy (int64).
+Shards are preallocated, manifest-<writer>.json records how many rows of each are filled - use loadDataset.
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import random
+import time
+
+import numpy as np
+
+import chessAI
+import chessEngine
+import moveOrdering
+
+numPlanes = 29
+pieceCodeRange = np.arange(1, 25, dtype=np.uint8)[:, None, None]
+
+
+""" the 29 x 10 x 10 uint8 planes of a position """
+def encodePlanes(gs):
+    planes = np.zeros((numPlanes, 10, 10), dtype=np.uint8)
+    planes[:24] = gs.boardCodes().reshape(10, 10) == pieceCodeRange
+    planes[24] = gs.whiteToMove
+    mask = gs.currentCastleRights.mask()
+    for i in range(4): # wks, bks, wqs, bqs
+        planes[25 + i] = mask >> i & 1
+    return planes
+
+
+class KeySet():
+    """ set of 63 bit zobrist keys in one int64 array with linear probing, 8 bytes per slot """
+
+    def __init__(self, capacity=1 << 20):
+        self.slots = np.zeros(capacity, dtype=np.int64) # 0 marks an empty slot
+        self.size = 0
+
+    """ add key, returns False if it was already there """
+    def add(self, key):
+        key = key or 1 # keep 0 free as the empty marker
+        if 10 * (self.size + 1) > 7 * len(self.slots):
+            self.grow()
+        mask = len(self.slots) - 1
+        i = key & mask
+        while self.slots[i]:
+            if self.slots[i] == key:
+                return False
+            i = (i + 1) & mask
+        self.slots[i] = key
+        self.size += 1
+        return True
+
+    def grow(self):
+        keys = self.slots[self.slots != 0]
+        self.slots = np.zeros(2 * len(self.slots), dtype=np.int64)
+        self.size = 0
+        for key in keys.tolist():
+            self.add(key)
+
+
+class ShardWriter():
+    """ appends samples to preallocated memory-mapped shards, opening a new shard when one is full """
+
+    def __init__(self, directory, name, shardSize):
+        self.directory = directory
+        self.name = name
+        self.shardSize = shardSize
+        self.manifestPath = os.path.join(directory, "manifest-%s.json" % name)
+        self.shards = [] # [file prefix, rows filled]
+        if os.path.exists(self.manifestPath): # continue an existing dataset
+            with open(self.manifestPath) as f:
+                self.shards = json.load(f)["shards"]
+        self.planes = None
+        if self.shards:
+            self.reopenShard()
+
+    def openShard(self):
+        prefix = "%s-%05d" % (self.name, len(self.shards))
+        path = os.path.join(self.directory, prefix)
+        openMap = np.lib.format.open_memmap
+        self.planes = openMap(path + "-planes.npy", mode="w+", dtype=np.uint8, shape=(self.shardSize, numPlanes, 10, 10))
+        self.labels = openMap(path + "-labels.npy", mode="w+", dtype=np.int32, shape=(self.shardSize, 3))
+        self.keys = openMap(path + "-keys.npy", mode="w+", dtype=np.int64, shape=(self.shardSize,))
+        self.shards.append([prefix, 0])
+
+    """ keep filling the last shard of an earlier run if it has free rows """
+    def reopenShard(self):
+        prefix, rows = self.shards[-1]
+        path = os.path.join(self.directory, prefix)
+        openMap = np.lib.format.open_memmap
+        planes = openMap(path + "-planes.npy", mode="r+")
+        if rows < len(planes): # its size is the --shard-size of the run that created it
+            self.planes = planes
+            self.labels = openMap(path + "-labels.npy", mode="r+")
+            self.keys = openMap(path + "-keys.npy", mode="r+")
+
+    def write(self, key, planes, labels):
+        if self.planes is None or self.shards[-1][1] == len(self.planes):
+            self.flush()
+            self.openShard()
+        row = self.shards[-1][1]
+        self.planes[row] = planes
+        self.labels[row] = labels
+        self.keys[row] = key
+        self.shards[-1][1] += 1
+
+    """ write the mapped pages and the manifest to disk """
+    def flush(self):
+        if self.planes is not None:
+            for array in (self.planes, self.labels, self.keys):
+                array.flush()
+        temp = self.manifestPath + ".tmp"
+        with open(temp, "w") as f:
+            json.dump({"shards": self.shards}, f)
+        os.replace(temp, self.manifestPath)
+
+
+""" all filled rows of a dataset as (planes, labels, keys) memory maps, one triple per shard """
+def loadDataset(directory):
+    dataset = []
+    for manifestPath in sorted(glob.glob(os.path.join(directory, "manifest-*.json"))):
+        with open(manifestPath) as f:
+            shards = json.load(f)["shards"]
+        for prefix, rows in shards:
+            path = os.path.join(directory, prefix)
+            dataset.append(tuple(np.load(path + suffix, mmap_mode="r")[:rows]
+                                 for suffix in ("-planes.npy", "-labels.npy", "-keys.npy")))
+    return dataset
+
+
+""" play one game, returns a list of (key, planes, score, ply) and the result for white (1, 0, -1) """
+def playGame(gs, search, rng, nodes, randomPlies, maxPlies):
+    samples = []
+    validMoves = gs.getValidMoves()
+    for ply in range(maxPlies):
+        if not validMoves:
+            break
+        search.orderer.decay()
+        move, score = search.think(gs, 64, maxNodes=nodes)
+        samples.append((gs.zobristKey, encodePlanes(gs), score, ply))
+        if ply < randomPlies or move is None: # random opening moves make the games differ
+            move = rng.choice(validMoves)
+        gs.makeMove(move)
+        validMoves = gs.getValidMoves()
+    if gs.isCheckMate:
+        return samples, -1 if gs.whiteToMove else 1
+    return samples, 0 # stalemate or too long
+
+
+""" player process: plays games and routes each position to the writer that owns its key """
+def playerMain(playerId, games, queues, nodes, randomPlies, maxPlies):
+    rng = random.Random(playerId * 7919 + int(time.time()))
+    gs = chessEngine.GameState()
+    startRecord = gs.packPosition()
+    search = chessAI.Search(moveOrdering.MoveOrderer(), chessAI.TranspositionTable())
+    for game in range(games):
+        gs.setPosition(startRecord)
+        samples, result = playGame(gs, search, rng, nodes, randomPlies, maxPlies)
+        batches = [[] for queue in queues]
+        for key, planes, score, ply in samples:
+            batches[key % len(queues)].append((key, planes, (result, score, ply)))
+        for queue, batch in zip(queues, batches):
+            if batch:
+                queue.put(batch) # blocks when the writer falls behind
+    for queue in queues:
+        queue.put(None)
+
+
+""" writer process: deduplicates its slice of the key space and appends to its shards """
+def writerMain(writerId, directory, queue, numPlayers, shardSize):
+    writer = ShardWriter(directory, "w%d" % writerId, shardSize)
+    seen = KeySet()
+    for prefix, rows in writer.shards: # keys written by earlier runs
+        for key in np.load(os.path.join(directory, prefix + "-keys.npy"), mmap_mode="r")[:rows].tolist():
+            seen.add(key)
+    finishedPlayers = 0
+    while finishedPlayers < numPlayers:
+        batch = queue.get()
+        if batch is None:
+            finishedPlayers += 1
+            continue
+        for key, planes, labels in batch:
+            if seen.add(key):
+                writer.write(key, planes, labels)
+        writer.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate self-play training data")
+    parser.add_argument("directory")
+    parser.add_argument("--games", type=int, default=10, help="games per player")
+    parser.add_argument("--players", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--nodes", type=int, default=300, help="search nodes per move")
+    parser.add_argument("--random-plies", type=int, default=8, help="opening plies played at random")
+    parser.add_argument("--max-plies", type=int, default=300, help="games longer than this count as draws")
+    parser.add_argument("--shard-size", type=int, default=100000, help="positions per shard")
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
+
+    start = time.time()
+    queues = [mp.Queue(maxsize=64) for i in range(args.writers)]
+    writers = [mp.Process(target=writerMain, args=(i, args.directory, queues[i], args.players, args.shard_size))
+               for i in range(args.writers)]
+    players = [mp.Process(target=playerMain, args=(i, args.games, queues, args.nodes, args.random_plies, args.max_plies))
+               for i in range(args.players)]
+    for process in writers + players:
+        process.start()
+    for process in players + writers:
+        process.join()
+    positions = sum(len(planes) for planes, labels, keys in loadDataset(args.directory))
+    print(f"{positions} unique positions in {args.directory} after {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
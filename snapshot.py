@@ -0,0 +1,104 @@
+"""
+Position snapshots for handing GameStates to worker processes.
+A snapshot is the fixed-size position record of chessEngine (positionSize bytes). Snapshots are written
+straight into a caller's buffer and read back from a buffer or memoryview without copying the buffer,
+and batches of them can be placed in multiprocessing shared memory.
+"""
+
+import pickle
+import sys
+import time
+from multiprocessing import shared_memory
+
+import chessEngine
+
+snapshotSize = chessEngine.positionSize
+
+
+""" write the position of gs into buf at offset, returns buf """
+def writeSnapshot(gs, buf, offset=0):
+    return gs.packPosition(buf, offset)
+
+
+""" rebuild a GameState from the snapshot at offset in buf - loads into gs if given, otherwise a new GameState """
+def readSnapshot(buf, offset=0, gs=None):
+    if gs is None:
+        gs = chessEngine.GameState()
+    gs.setPosition(memoryview(buf)[offset:offset + snapshotSize])
+    return gs
+
+
+class SnapshotBatch():
+    """
+    A batch of snapshots in one shared memory block. The creating process writes the positions,
+    workers attach by name and read them without any pickling
+    """
+
+    def __init__(self, size, name=None):
+        self.size = size
+        if name is None: #create a new block
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, size * snapshotSize))
+        else: #attach to a block created by another process
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+
+    """ create a batch holding the positions of a list of GameStates """
+    @classmethod
+    def fromStates(cls, states):
+        batch = cls(len(states))
+        for i, gs in enumerate(states):
+            batch[i] = gs
+        return batch
+
+    def __len__(self):
+        return self.size
+
+    def __setitem__(self, i, gs):
+        writeSnapshot(gs, self.buf, i * snapshotSize)
+
+    def __getitem__(self, i):
+        return self.read(i)
+
+    """ read snapshot i, reusing gs if given """
+    def read(self, i, gs=None):
+        if not 0 <= i < self.size:
+            raise IndexError("snapshot index out of range")
+        return readSnapshot(self.buf, i * snapshotSize, gs)
+
+    """ detach this process from the block """
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+    """ free the block, call once from the creating process after all workers closed it """
+    def unlink(self):
+        self.shm.unlink()
+
+
+""" compare snapshot transport with pickling a GameState """
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    gs = chessEngine.GameState()
+    for move in gs.getValidMoves()[:1]:
+        gs.makeMove(move)
+
+    start = time.time()
+    for i in range(count):
+        data = pickle.dumps(gs)
+        pickle.loads(data)
+    pickleTime = (time.time() - start) / count
+    print(f"pickle:   {len(data)} bytes, {pickleTime*1e6:.1f} us per round trip")
+
+    buf = bytearray(snapshotSize)
+    target = chessEngine.GameState()
+    start = time.time()
+    for i in range(count):
+        writeSnapshot(gs, buf)
+        readSnapshot(buf, gs=target)
+    snapshotTime = (time.time() - start) / count
+    print(f"snapshot: {snapshotSize} bytes, {snapshotTime*1e6:.1f} us per round trip")
+
+
+if __name__ == "__main__":
+    main()